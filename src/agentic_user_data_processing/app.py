@@ -6,25 +6,55 @@ financial documents (e.g., W-2 PDFs). It exposes a small REST API that
 other microservices can call to record interactions and fetch enriched
 context for downstream LLM prompts.
 """
+import asyncio
+import tempfile
+import uuid
+from typing import BinaryIO
+
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 import logging
 from . import models, schemas
-from .db import get_db, init_db
+from .db import get_db, init_db, session_scope
 from .services import context as context_service
 from .services import storage as storage_service
 from .services import extraction as extraction_service
 from .services import extraction_1099 as extraction_1099_service
 from .services import extraction_portfolio as extraction_portfolio_service
+from .services import llm as llm_service
 from .services import pdf_utils
 
-app = FastAPI(title="Agentic User Data Processing Service")
+app = FastAPI(
+    title="Agentic User Data Processing Service",
+    default_response_class=ORJSONResponse,
+)
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
     """Ensure database tables exist when the service starts."""
-    init_db()
+    await init_db()
+    # Build the shared VertexAI client now so the first upload doesn't pay
+    # the construction latency.
+    try:
+        llm_service.get_llm()
+    except ValueError:
+        logger.warning("VERTEXAI_CREDENTIALS not set; extraction will return empty fields")
+        return
+    # Fire-and-forget priming call so the first real upload doesn't pay the
+    # TLS/channel handshake to Vertex.
+    asyncio.create_task(asyncio.to_thread(_warm_llm))
+
+
+def _warm_llm() -> None:
+    try:
+        llm_service.get_llm().invoke("ping")
+        logger.info("Vertex AI channel warmed")
+    except Exception as e:
+        logger.warning(f"Vertex AI warmup failed: {e}")
 
 #health check
 @app.get("/health")
@@ -32,136 +62,183 @@ def health_check():
     return {"status": "ok"}
 
 
+async def _spool_upload(file: UploadFile) -> BinaryIO:
+    """Copy an upload into a seekable spooled temp file, one chunk at a time."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=pdf_utils.COPY_CHUNK_SIZE, suffix=".pdf")
+    while chunk := await file.read(pdf_utils.COPY_CHUNK_SIZE):
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
 
 @app.post("/sessions/", response_model=schemas.SessionResponse)
-def create_session(payload: schemas.SessionCreate, db: Session = Depends(get_db)):
-    user = models.User.get_or_create(db, user_id=payload.user_id, external_id=str(payload.user_id))
-    session = models.Session.create(db, user_id=user.id)
-    return schemas.SessionResponse.from_orm(session)
+async def create_session(payload: schemas.SessionCreate, db: AsyncSession = Depends(get_db)):
+    user = await models.User.get_or_create(db, user_id=payload.user_id, external_id=str(payload.user_id))
+    session = await models.Session.create(db, user_id=user.id)
+    return schemas.SessionResponse.model_validate(session)
 
 
 @app.post("/sessions/{session_id}/messages", response_model=schemas.MessageResponse)
-def append_message(
-    session_id: str, payload: schemas.MessageCreate, db: Session = Depends(get_db)
+async def append_message(
+    session_id: str, payload: schemas.MessageCreate, db: AsyncSession = Depends(get_db)
 ):
-    session = models.Session.get(db, session_id)
+    session = await models.Session.get(db, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    message = models.Message.create(
+    message = await models.Message.create(
         db,
         session_id=session_id,
         role=payload.role,
         content=payload.content,
     )
-    return schemas.MessageResponse.from_orm(message)
+    return schemas.MessageResponse.model_validate(message)
 
 
 @app.post("/sessions/{session_id}/w2", response_model=schemas.DocumentResponse)
 async def upload_w2(
     session_id: str,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
 ):
-    session = models.Session.get(db, session_id)
-    if session is None:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    contents = await file.read()
-    flattened = pdf_utils.flatten_pdf(contents)
-
-    gcs_uri = storage_service.save_document_bytes(
-        session_id=session_id,
-        filename=file.filename,
-        contents=flattened,
-        content_type=file.content_type,
+    # Short session window: existence check only, so no pool connection is
+    # held across the multi-second GCS/Vertex awaits below.
+    async with session_scope() as db:
+        session = await models.Session.get(db, session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    spooled = await _spool_upload(file)
+    # pdftk + temp-file copies are blocking disk I/O; keep them off the loop.
+    flattened = await asyncio.to_thread(pdf_utils.flatten_pdf_stream, spooled)
+
+    # GCS PUT and Vertex extraction are independent I/O; overlap them.
+    flattened.seek(0)
+    pdf_bytes = flattened.read()
+    gcs_uri, extracted = await asyncio.gather(
+        asyncio.to_thread(
+            storage_service.save_document_stream,
+            session_id=session_id,
+            filename=file.filename,
+            fileobj=flattened,
+            content_type=file.content_type,
+        ),
+        extraction_service.extract_w2_fields(pdf_bytes),
     )
-    extracted = await extraction_service.extract_w2_fields(flattened)
 
-    document = models.Document.create(
-        db,
-        session_id=session_id,
-        document_type="w2",
-        gcs_uri=gcs_uri,
-        raw_metadata=extracted.model_dump_json(),
-    )
-    return schemas.DocumentResponse.from_orm(document)
+    async with session_scope() as db:
+        document = await models.Document.create(
+            db,
+            session_id=session_id,
+            document_type="w2",
+            gcs_uri=gcs_uri,
+            raw_metadata=extracted.model_dump(mode="json"),
+        )
+        return schemas.DocumentResponse.model_validate(document)
 
 @app.post("/sessions/{session_id}/1099", response_model=schemas.DocumentResponse)
 async def upload_1099(
     session_id: str,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
 ):
-    session = models.Session.get(db, session_id)
-    if session is None:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    contents = await file.read()
-    flattened = pdf_utils.flatten_pdf(contents)
-
-    gcs_uri = storage_service.save_document_bytes(
-        session_id=session_id,
-        filename=file.filename,
-        contents=flattened,
-        content_type=file.content_type,
+    async with session_scope() as db:
+        session = await models.Session.get(db, session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    spooled = await _spool_upload(file)
+    # pdftk + temp-file copies are blocking disk I/O; keep them off the loop.
+    flattened = await asyncio.to_thread(pdf_utils.flatten_pdf_stream, spooled)
+
+    # Use the dedicated 1099 extractor, overlapped with the GCS PUT.
+    flattened.seek(0)
+    pdf_bytes = flattened.read()
+    gcs_uri, extracted = await asyncio.gather(
+        asyncio.to_thread(
+            storage_service.save_document_stream,
+            session_id=session_id,
+            filename=file.filename,
+            fileobj=flattened,
+            content_type=file.content_type,
+        ),
+        extraction_1099_service.extract_1099_fields(pdf_bytes),
     )
 
-    # Use the dedicated 1099 extractor
-    extracted = await extraction_1099_service.extract_1099_fields(flattened)
-
-    document = models.Document.create(
-        db,
-        session_id=session_id,
-        document_type="1099",
-        gcs_uri=gcs_uri,
-        raw_metadata=extracted.model_dump_json(),
-    )
-
-    return schemas.DocumentResponse.from_orm(document)
+    async with session_scope() as db:
+        document = await models.Document.create(
+            db,
+            session_id=session_id,
+            document_type="1099",
+            gcs_uri=gcs_uri,
+            raw_metadata=extracted.model_dump(mode="json"),
+        )
+        return schemas.DocumentResponse.model_validate(document)
 
 
 @app.post("/sessions/{session_id}/portfolio", response_model=schemas.DocumentResponse)
 async def upload_portfolio(
     session_id: str,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
 ):
     """Upload and process a Fidelity portfolio summary for a session."""
-    session = models.Session.get(db, session_id)
-    if session is None:
-        raise HTTPException(status_code=404, detail="Session not found")
+    async with session_scope() as db:
+        session = await models.Session.get(db, session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
 
-    contents = await file.read()
-    flattened = pdf_utils.flatten_pdf(contents)
+    spooled = await _spool_upload(file)
+    # pdftk + temp-file copies are blocking disk I/O; keep them off the loop.
+    flattened = await asyncio.to_thread(pdf_utils.flatten_pdf_stream, spooled)
 
-    gcs_uri = storage_service.save_document_bytes(
+    gcs_uri = await asyncio.to_thread(
+        storage_service.save_document_stream,
         session_id=session_id,
         filename=file.filename,
-        contents=flattened,
+        fileobj=flattened,
         content_type=file.content_type,
     )
 
     # Use the dedicated portfolio extractor
-    extracted = await extraction_portfolio_service.extract_portfolio_fields(flattened)
+    flattened.seek(0)
+    extracted = await extraction_portfolio_service.extract_portfolio_fields(flattened.read())
 
-    document = models.Document.create(
-        db,
-        session_id=session_id,
-        document_type="portfolio",
-        gcs_uri=gcs_uri,
-        raw_metadata=extracted.model_dump_json(),
-    )
-
-    return schemas.DocumentResponse.from_orm(document)
+    async with session_scope() as db:
+        document = await models.Document.create(
+            db,
+            session_id=session_id,
+            document_type="portfolio",
+            gcs_uri=gcs_uri,
+            raw_metadata=extracted.model_dump(mode="json"),
+        )
+        return schemas.DocumentResponse.model_validate(document)
 
 
 @app.get("/sessions/{session_id}/context", response_model=schemas.SessionContext)
-def get_session_context(session_id: str, db: Session = Depends(get_db)):
-    session = models.Session.get(db, session_id)
+async def get_session_context(session_id: str, db: AsyncSession = Depends(get_db)):
+    try:
+        key = uuid.UUID(str(session_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    # One query instead of three: messages and documents are eager-loaded
+    # alongside the session row, hydrating only the columns build_context
+    # actually reads.
+    result = await db.execute(
+        select(models.Session)
+        .options(
+            selectinload(models.Session.messages).load_only(
+                models.Message.role, models.Message.content, models.Message.created_at
+            ),
+            selectinload(models.Session.documents).load_only(
+                models.Document.document_type, models.Document.raw_metadata
+            ),
+        )
+        .where(models.Session.id == key)
+    )
+    session = result.scalar_one_or_none()
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    messages = models.Message.latest_for_session(db, session_id=session_id, limit=20)
-    documents = db.query(models.Document).filter(models.Document.session_id == session_id).all()
-    return context_service.build_context(session=session, messages=messages, documents=documents)
+
+    # Oldest-first already, so build_context consumes the list as-is.
+    messages = sorted(session.messages, key=lambda m: m.created_at)[-20:]
+    return context_service.build_context(session=session, messages=messages, documents=session.documents)
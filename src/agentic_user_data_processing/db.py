@@ -2,11 +2,11 @@
 SQLAlchemy database utilities for the FinWhiz agent service (Cloud-only version).
 """
 import os
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 # Expect the following environment variables to be set in Cloud Run:
 #   DB_USER=postgres
@@ -34,47 +34,58 @@ else:
     # Assume it's the password directly
     DB_PASS = db_pass_value
 
-# Cloud SQL connection string via Unix socket path
-DATABASE_URL =  f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
+# Cloud SQL connection string via Unix socket path. asyncpg keeps the event
+# loop free while a query is in flight, so an awaited Gemini call in a handler
+# never pins a worker thread the way the sync psycopg2 driver did.
+DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
 
-# --- SQLAlchemy engine and session setup ---
-engine = create_engine(
+# --- SQLAlchemy async engine and session setup ---
+engine = create_async_engine(
     DATABASE_URL,
     pool_pre_ping=True,  # auto-reconnects dropped connections
-    pool_size=5,
-    max_overflow=2,
-    future=True,
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,  # refresh connections before Cloud SQL idles them out
+    pool_timeout=5,  # fail fast instead of queueing forever on exhaustion
 )
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
-def init_db() -> None:
+async def init_db() -> None:
     """Create tables if they do not already exist."""
     from . import models  # noqa: F401 (ensures model metadata is loaded)
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
 
-@contextmanager
-def session_scope() -> Iterator[Session]:
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
     """Provide a transactional scope for scripts."""
     db = SessionLocal()
     try:
         yield db
-        db.commit()
+        await db.commit()
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise
     finally:
-        db.close()
+        await db.close()
 
 
-def get_db() -> Iterator[Session]:
-    """FastAPI dependency providing a transactional session."""
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency providing a transactional session.
+
+    Model helpers only flush; the commit happens once here when the request
+    finishes, saving a round-trip per create call.
+    """
     db = SessionLocal()
     try:
         yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
     finally:
-        db.close()
-
+        await db.close()
@@ -5,9 +5,10 @@ import uuid
 from datetime import datetime
 from typing import Iterable, Optional, List
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Row, String, Text, select
+from sqlalchemy.dialects.postgresql import JSONB, UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
 
@@ -22,23 +23,31 @@ class User(Base):
     sessions: Mapped[List["Session"]] = relationship("Session", back_populates="user")
 
     @classmethod
-    def get_or_create(
+    async def get_or_create(
         cls,
-        db: Session,
+        db: AsyncSession,
         *,
         user_id: Optional[uuid.UUID] = None,
         external_id: Optional[str] = None,
     ) -> "User":
         if external_id:
-            instance = db.query(cls).filter_by(external_id=external_id).first()
-            if instance:
-                return instance
-        if user_id and (existing := db.get(cls, user_id)):
+            # Single race-safe round-trip: insert, or return the existing row
+            # on external_id conflict.
+            stmt = (
+                pg_insert(cls)
+                .values(id=user_id or uuid.uuid4(), external_id=external_id)
+                .on_conflict_do_update(
+                    index_elements=[cls.external_id],
+                    set_={"external_id": external_id},
+                )
+                .returning(cls)
+            )
+            return (await db.execute(stmt)).scalar_one()
+        if user_id and (existing := await db.get(cls, user_id)):
             return existing
         instance = cls(id=user_id or uuid.uuid4(), external_id=external_id)
         db.add(instance)
-        db.commit()
-        db.refresh(instance)
+        await db.flush()
         return instance
 
 
@@ -54,73 +63,75 @@ class Session(Base):
     documents: Mapped[List["Document"]] = relationship("Document", back_populates="session", cascade="all, delete-orphan")
 
     @classmethod
-    def create(cls, db: Session, *, user_id: uuid.UUID) -> "Session":
+    async def create(cls, db: AsyncSession, *, user_id: uuid.UUID) -> "Session":
         instance = cls(user_id=user_id)
         db.add(instance)
-        db.commit()
-        db.refresh(instance)
+        await db.flush()
         return instance
 
     @classmethod
-    def get(cls, db: Session, session_id: str) -> Optional["Session"]:
+    async def get(cls, db: AsyncSession, session_id: str) -> Optional["Session"]:
         try:
             key = uuid.UUID(str(session_id))
         except (ValueError, TypeError):
             return None
-        return db.get(cls, key)
+        return await db.get(cls, key)
 
 
 class Message(Base):
     __tablename__ = "messages"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False, index=True)
+    session_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False)
     role: Mapped[str] = mapped_column(String(16), nullable=False)  # "user" or "assistant"
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     session: Mapped[Session] = relationship("Session", back_populates="messages")
 
     @classmethod
-    def create(cls, db: Session, *, session_id: str, role: str, content: str) -> "Message":
+    async def create(cls, db: AsyncSession, *, session_id: str, role: str, content: str) -> "Message":
         instance = cls(session_id=uuid.UUID(str(session_id)), role=role, content=content)
         db.add(instance)
-        db.commit()
-        db.refresh(instance)
+        await db.flush()
         return instance
 
     @classmethod
-    def latest_for_session(cls, db: Session, *, session_id: str, limit: int = 20) -> Iterable["Message"]:
-        return (
-            db.query(cls)
-            .filter(cls.session_id == uuid.UUID(str(session_id)))
+    async def latest_for_session(cls, db: AsyncSession, *, session_id: str, limit: int = 20) -> Iterable[Row]:
+        # Column-only select: build_context reads role/content/created_at, so
+        # skip full ORM hydration and return plain Row tuples. The DESC/LIMIT
+        # query rides the composite index; one reversal here hands callers
+        # the rows oldest-first.
+        result = await db.execute(
+            select(cls.role, cls.content, cls.created_at)
+            .where(cls.session_id == uuid.UUID(str(session_id)))
             .order_by(cls.created_at.desc())
             .limit(limit)
-            .all()
         )
+        return list(reversed(result.all()))
 
 
 class Document(Base):
     __tablename__ = "documents"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False, index=True)
+    session_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False)
     document_type: Mapped[str] = mapped_column(String(32), nullable=False)
     gcs_uri: Mapped[str] = mapped_column(String(512), nullable=False)
-    raw_metadata: Mapped[str] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+    raw_metadata: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     session: Mapped[Session] = relationship("Session", back_populates="documents")
 
     @classmethod
-    def create(
+    async def create(
         cls,
-        db: Session,
+        db: AsyncSession,
         *,
         session_id: str,
         document_type: str,
         gcs_uri: str,
-        raw_metadata: Optional[str],
+        raw_metadata: Optional[dict],
     ) -> "Document":
         instance = cls(
             session_id=uuid.UUID(str(session_id)),
@@ -129,15 +140,21 @@ class Document(Base):
             raw_metadata=raw_metadata,
         )
         db.add(instance)
-        db.commit()
-        db.refresh(instance)
+        await db.flush()
         return instance
 
     @classmethod
-    def latest_for_session(cls, db: Session, *, session_id: str) -> Optional["Document"]:
-        return (
-            db.query(cls)
-            .filter(cls.session_id == uuid.UUID(session_id))
+    async def latest_for_session(cls, db: AsyncSession, *, session_id: str) -> Optional[Row]:
+        result = await db.execute(
+            select(cls.id, cls.document_type, cls.raw_metadata)
+            .where(cls.session_id == uuid.UUID(session_id))
             .order_by(cls.created_at.desc())
-            .first()
+            .limit(1)
         )
+        return result.first()
+
+
+# Composite DESC indexes matching the "latest N for a session" access pattern:
+# the LIMIT-bounded queries become a single index range scan with no sort node.
+Index("ix_messages_session_created", Message.session_id, Message.created_at.desc())
+Index("ix_documents_session_created", Document.session_id, Document.created_at.desc())
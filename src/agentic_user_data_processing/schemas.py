@@ -5,7 +5,7 @@ import uuid
 from datetime import datetime
 from typing import List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class SessionCreate(BaseModel):
@@ -17,8 +17,7 @@ class SessionResponse(BaseModel):
     user_id: uuid.UUID
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MessageCreate(BaseModel):
@@ -33,8 +32,7 @@ class MessageResponse(BaseModel):
     content: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentResponse(BaseModel):
@@ -42,11 +40,10 @@ class DocumentResponse(BaseModel):
     session_id: uuid.UUID
     document_type: str
     gcs_uri: str
-    raw_metadata: Optional[str]
+    raw_metadata: Optional[dict]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ChatTurn(BaseModel):
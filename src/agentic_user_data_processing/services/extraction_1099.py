@@ -2,18 +2,25 @@
 Utilities for extracting structured data from uploaded 1099-INT documents.
 """
 import asyncio
-import json
-import os
-from typing import Optional
+import hashlib
+import logging
+from typing import Dict
 
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from langchain_google_vertexai import VertexAI
+from pydantic import TypeAdapter, ValidationError
 
 from .. import schemas
 from . import parser
+from .llm import get_llm
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Compiled once; validates Gemini's JSON straight through pydantic-core.
+_1099_ADAPTER = TypeAdapter(schemas.Form1099Fields)
+
 EXTRACTION_PROMPT_1099 = """You are a parsing assistant. Using the supplied 1099-INT text, extract only the fields defined below.
 Return ONLY valid JSON with the exact keys shown — no explanations or text outside the JSON.
 
@@ -44,56 +51,68 @@ Output schema:
 Respond with JSON only.
 """
 
-_llm: Optional[VertexAI] = None
+# Fingerprint cache mirroring the W-2 extractor: identical re-uploads skip
+# the parse + Vertex call, and per-fingerprint locks coalesce concurrent
+# requests for the same PDF.
+_extraction_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_extraction_locks: Dict[str, asyncio.Lock] = {}
 
 
-def _get_llm() -> VertexAI:
-    """
-    Lazy-init a global VertexAI LLM with proper credentials and project.
-    Matches W-2 extractor structure exactly.
-    """
-    global _llm
-    if _llm is None:
-        VERTEXAI_CREDENTIALS = os.getenv("VERTEXAI_CREDENTIALS")
-        if not VERTEXAI_CREDENTIALS:
-            raise ValueError("VERTEXAI_CREDENTIALS must be set")
+def _fingerprint(pdf_bytes: bytes) -> str:
+    return hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
 
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = VERTEXAI_CREDENTIALS
-        _llm = VertexAI(model_name="gemini-2.5-pro")
-        print("[_get_llm] Initialized VertexAI model (gemini-2.5-pro)")
-    return _llm
 
 async def extract_1099_fields(pdf_bytes: bytes) -> schemas.Form1099Fields:
+    """
+    Extract 1099-INT fields, memoized on a fingerprint of the PDF bytes.
+    Mirrors the W-2 extractor's cache exactly.
+    """
+    key = _fingerprint(pdf_bytes)
+    cached = _extraction_cache.get(key)
+    if cached is not None:
+        return cached
+
+    lock = _extraction_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached = _extraction_cache.get(key)
+        if cached is None:
+            cached = await _extract_1099_fields(pdf_bytes)
+            _extraction_cache[key] = cached
+    _extraction_locks.pop(key, None)
+    return cached
+
+
+async def _extract_1099_fields(pdf_bytes: bytes) -> schemas.Form1099Fields:
     """
     Parse raw PDF bytes and use Gemini to extract 1099-INT key fields.
-    Mirrors W-2 logic but with detailed print debugging.
+    Mirrors W-2 logic, with debug-level tracing.
     """
-    print("[extract_1099_fields] Starting extraction...")
-
     # Step 1: Extract text from PDF
     try:
-        document_text = parser.extract_text_from_pdf(pdf_bytes)
-        print(f"[extract_1099_fields] Extracted {len(document_text)} characters of text")
-    except Exception as e:
-        print(f"[extract_1099_fields] Failed to extract text: {e}")
+        document_text = parser.extract_text_from_pdf(pdf_bytes, max_chars=5000)
+        logger.debug("Extracted %d characters of text", len(document_text))
+    except Exception:
+        logger.exception("Failed to extract text from 1099 PDF")
         document_text = ""
 
     if not document_text:
-        print("[extract_1099_fields] No text found, returning empty schema")
+        logger.debug("No text found, returning empty schema")
         return schemas.Form1099Fields()
 
-    print(f"[extract_1099_fields] Sample extracted text (first 600 chars):\n{document_text[:600]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Sample extracted text (first 600 chars): %s", document_text[:600])
 
-    # Step 2: Build prompt (truncate for safety)
-    prompt = EXTRACTION_PROMPT_1099.format(document_text=document_text[:4000])
-    print(f"[extract_1099_fields] Built prompt of length {len(prompt)} characters")
+    # Step 2: Build prompt (truncate for safety; drop the full text so only
+    # the snippet stays alive across the Vertex call)
+    snippet = document_text[:4000]
+    del document_text
+    prompt = EXTRACTION_PROMPT_1099.format(document_text=snippet)
 
     # Step 3: Call Gemini
     try:
-        llm = _get_llm()
-        print("[extract_1099_fields] Invoking Gemini model...")
+        llm = get_llm()
         response = await asyncio.to_thread(llm.invoke, prompt)
-        print(f"[extract_1099_fields] Raw Gemini response: {response}")
+        logger.debug("Raw Gemini response: %s", response)
 
         raw = str(response).strip()
         if raw.startswith("```"):
@@ -101,17 +120,8 @@ async def extract_1099_fields(pdf_bytes: bytes) -> schemas.Form1099Fields:
             if raw.lower().startswith("json"):
                 raw = raw[4:].lstrip()
 
-        print(f"[extract_1099_fields] Cleaned response (first 200 chars): {raw[:200]}")
-
-        data = json.loads(raw)
-        print(f"[extract_1099_fields] Parsed JSON keys: {list(data.keys())}")
-
-        for k, v in data.items():
-            print(f"  - {k}: {v!r}")
-
-        print("[extract_1099_fields] Returning populated Form1099Fields object")
-        return schemas.Form1099Fields(**data)
+        return _1099_ADAPTER.validate_json(raw)
 
-    except (json.JSONDecodeError, RuntimeError, Exception) as e:
-        print(f"[extract_1099_fields] Extraction failed with error: {e}")
+    except (ValidationError, ValueError):
+        logger.exception("1099 extraction failed")
         return schemas.Form1099Fields()
\ No newline at end of file
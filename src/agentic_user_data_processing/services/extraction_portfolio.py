@@ -2,26 +2,93 @@
 Utilities for extracting structured data from uploaded Fidelity portfolio summaries.
 """
 import asyncio
-import json
-import os
-from typing import Optional
+import functools
+import logging
+from typing import List, Optional, Tuple
 
 from dotenv import load_dotenv
-from langchain_google_vertexai import VertexAI
+from pydantic import ValidationError
 
 from .. import schemas
 from . import parser
+from .llm import get_llm
 
 load_dotenv()
 
-EXTRACTION_PROMPT_PORTFOLIO = """You are a parsing assistant. Using the supplied Fidelity portfolio summary text, extract the requested fields.
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_portfolio_llm():
+    """Shared client bound to emit PortfolioFields-shaped JSON directly."""
+    return get_llm().bind(
+        response_mime_type="application/json",
+        response_schema=schemas.PortfolioFields.model_json_schema(),
+    )
+
+# Micro-batching: prompts arriving within the window are submitted as one
+# llm.batch call, amortizing per-request Vertex overhead under concurrent
+# uploads.
+_BATCH_WINDOW_S = 0.05
+_BATCH_MAX = 8
+_batch_queue: Optional[asyncio.Queue] = None
+_batch_task: Optional[asyncio.Task] = None
+
+
+async def _invoke_batched(prompt: str) -> str:
+    """Queue a prompt for the batch worker and await its result."""
+    global _batch_queue, _batch_task
+    loop = asyncio.get_running_loop()
+    if _batch_queue is None:
+        _batch_queue = asyncio.Queue()
+        _batch_task = asyncio.create_task(_batch_worker())
+    future: asyncio.Future = loop.create_future()
+    _batch_queue.put_nowait((prompt, future))
+    return await future
+
+
+async def _batch_worker() -> None:
+    """Collect prompts for up to the window (or the cap) and batch them."""
+    loop = asyncio.get_running_loop()
+    while True:
+        pending: List[Tuple[str, asyncio.Future]] = [await _batch_queue.get()]
+        deadline = loop.time() + _BATCH_WINDOW_S
+        while len(pending) < _BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(_batch_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        prompts = [p for p, _ in pending]
+        try:
+            llm = _get_portfolio_llm()
+            # Native async client: no thread per batch, and concurrent
+            # batches multiplex on the event loop's connection pool.
+            results = await llm.abatch(prompts)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+# Constant prompt halves around the document slot: plain concatenation at
+# request time, no str.format template walk and no {{ }} escaping.
+_PROMPT_PREFIX = """You are a parsing assistant. Using the supplied Fidelity portfolio summary text, extract the requested fields.
 Return ONLY valid JSON with the exact keys shown. If a field is not found, use null or an empty array for holdings.
 
 Portfolio summary text (may be truncated):
-{document_text}
+"""
+
+_PROMPT_SUFFIX = """
 
 Output schema:
-{{
+{
   "total_portfolio_value": "",
   "account_name": "",
   "account_number": "",
@@ -33,16 +100,16 @@ Output schema:
   "cash_percentage": "",
   "other_percentage": "",
   "holdings": [
-    {{
+    {
       "ticker": "",
       "name": "",
       "shares": "",
       "value": "",
       "asset_class": ""
-    }}
+    }
   ],
   "notes": ""
-}}
+}
 
 IMPORTANT INSTRUCTIONS:
 - Extract total portfolio value, account information, and statement date with high priority
@@ -56,26 +123,6 @@ IMPORTANT INSTRUCTIONS:
 Respond with JSON only.
 """
 
-_llm: Optional[VertexAI] = None
-
-
-def _get_llm() -> VertexAI:
-    """
-    Lazy-init a global VertexAI LLM with proper credentials and project.
-    Matches W-2 and 1099 extractor structure exactly.
-    """
-    global _llm
-    if _llm is None:
-        VERTEXAI_CREDENTIALS = os.getenv("VERTEXAI_CREDENTIALS")
-        if not VERTEXAI_CREDENTIALS:
-            raise ValueError("VERTEXAI_CREDENTIALS must be set")
-
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = VERTEXAI_CREDENTIALS
-        _llm = VertexAI(model_name="gemini-2.5-pro")
-        print("[_get_llm] Initialized VertexAI model (gemini-2.5-pro) for portfolio extraction")
-    return _llm
-
-
 async def extract_portfolio_fields(pdf_bytes: bytes) -> schemas.PortfolioFields:
     """
     Parse raw PDF bytes and use Gemini to extract Fidelity portfolio summary key fields.
@@ -86,58 +133,40 @@ async def extract_portfolio_fields(pdf_bytes: bytes) -> schemas.PortfolioFields:
     If credentials are missing or parsing fails, return an empty schema
     so the application can continue operating.
     """
-    print("[extract_portfolio_fields] Starting portfolio extraction...")
+    logger.debug("Starting portfolio extraction")
 
     # Step 1: Extract text from PDF
     try:
-        document_text = parser.extract_text_from_pdf(pdf_bytes)
-        print(f"[extract_portfolio_fields] Extracted {len(document_text)} characters of text")
-    except Exception as e:
-        print(f"[extract_portfolio_fields] Failed to extract text: {e}")
+        document_text = parser.extract_text_from_pdf(pdf_bytes, max_pages=5)
+        logger.debug("Extracted %d characters of text", len(document_text))
+    except Exception:
+        logger.exception("Failed to extract text from portfolio PDF")
         document_text = ""
 
     if not document_text:
-        print("[extract_portfolio_fields] No text found, returning empty schema")
+        logger.debug("No text found, returning empty schema")
         return schemas.PortfolioFields()
 
-    print(f"[extract_portfolio_fields] Sample extracted text (first 600 chars):\n{document_text[:600]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Sample extracted text (first 600 chars): %s", document_text[:600])
 
     # Step 2: Build prompt (truncate for safety, but allow more text for portfolios)
-    prompt = EXTRACTION_PROMPT_PORTFOLIO.format(document_text=document_text[:8000])
-    print(f"[extract_portfolio_fields] Built prompt of length {len(prompt)} characters")
+    prompt = _PROMPT_PREFIX + document_text[:8000] + _PROMPT_SUFFIX
+    logger.debug("Built prompt of length %d characters", len(prompt))
 
     # Step 3: Call Gemini
     try:
-        llm = _get_llm()
-        print("[extract_portfolio_fields] Invoking Gemini model...")
-        response = await asyncio.to_thread(llm.invoke, prompt)
-        print(f"[extract_portfolio_fields] Raw Gemini response: {response}")
-
-        raw = str(response).strip()
-        
-        # Clean markdown code fences if present
-        if raw.startswith("```"):
-            raw = raw.strip("`")
-            if raw.lower().startswith("json"):
-                raw = raw[4:].lstrip()
-
-        print(f"[extract_portfolio_fields] Cleaned response (first 300 chars): {raw[:300]}")
-
-        data = json.loads(raw)
-        print(f"[extract_portfolio_fields] Parsed JSON keys: {list(data.keys())}")
-
-        # Log extracted values for debugging
-        for k, v in data.items():
-            if k != "holdings":  # Don't spam with holdings details
-                print(f"  - {k}: {v!r}")
-            else:
-                holdings_count = len(v) if v else 0
-                print(f"  - holdings: [{holdings_count} positions]")
-
-        print("[extract_portfolio_fields] Returning populated PortfolioFields object")
-        return schemas.PortfolioFields(**data)
-
-    except (json.JSONDecodeError, RuntimeError, Exception) as e:
-        print(f"[extract_portfolio_fields] Extraction failed with error: {e}")
+        logger.debug("Invoking Gemini model")
+        response = await _invoke_batched(prompt)
+        logger.debug("Raw Gemini response: %s", response)
+
+        # The client is bound to response_mime_type="application/json" with
+        # the PortfolioFields schema, so the output is parsable JSON — no
+        # fence-stripping needed.
+        logger.debug("Returning populated PortfolioFields object")
+        return schemas.PortfolioFields.model_validate_json(str(response).strip())
+
+    except (ValidationError, ValueError, RuntimeError):
+        logger.exception("Portfolio extraction failed")
         return schemas.PortfolioFields()
 
@@ -0,0 +1,39 @@
+"""
+Shared VertexAI client for the extraction services.
+"""
+import functools
+import os
+
+from dotenv import load_dotenv
+from google.oauth2 import service_account
+from langchain_google_vertexai import VertexAI
+
+load_dotenv()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_credentials() -> service_account.Credentials:
+    """Parse the service-account key file once and reuse the object."""
+    VERTEXAI_CREDENTIALS = os.getenv("VERTEXAI_CREDENTIALS")
+    if not VERTEXAI_CREDENTIALS:
+        raise ValueError("VERTEXAI_CREDENTIALS must be set")
+    return service_account.Credentials.from_service_account_file(VERTEXAI_CREDENTIALS)
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm() -> VertexAI:
+    """
+    Return the process-wide VertexAI client, constructing it on first call.
+
+    lru_cache makes the init thread-safe and guarantees a single client (and
+    a single underlying auth session/channel) shared by all extractors,
+    instead of one lazily-built client per module. The credentials file is
+    read and parsed exactly once, synchronously, here — so the client never
+    does a blocking key-file read from inside the event loop on first use.
+    """
+    credentials = _get_credentials()
+    return VertexAI(
+        model_name="gemini-2.5-pro",
+        credentials=credentials,
+        project=credentials.project_id,
+    )
@@ -1,82 +1,192 @@
 """
 PDF parsing helpers.
-Now supports flattening with Ghostscript, pdfminer fallback, and CID cleanup.
+Now supports flattening with Ghostscript, PyMuPDF extraction with a
+pdfminer fallback, and CID cleanup.
 """
 import io
+import logging
+import os
 import re
 import subprocess
-from pathlib import Path
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import fitz
 from pypdf import PdfReader
-from pdfminer.high_level import extract_text as pdfminer_extract_text
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+# Below this many useful characters, PyMuPDF's output is treated as a miss
+# and we fall back to pdfminer.
+_FALLBACK_THRESHOLD = 200
+
+# Compiled once; the cleanup runs on every extraction.
+_CID_RE = re.compile(r"\(cid:\d+\)")
+_WS_RE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+
+def _is_rich(text: str) -> bool:
+    """Whether extracted text is usable as-is, with no pdfminer pass."""
+    stripped = text.strip()
+    if len(stripped) < _FALLBACK_THRESHOLD:
+        return False
+    alnum_ratio = sum(c.isalnum() for c in stripped) / len(stripped)
+    # CID-heavy output means the font encoding defeated the extractor even
+    # if the string is long.
+    return alnum_ratio > 0.5 and stripped.count("(cid:") < 10
+
+# Minimal layout analysis: output feeds an LLM prompt, so vertical-text
+# detection and figure-text recursion (pdfminer's worst-case cost drivers)
+# are disabled.
+_LAPARAMS = LAParams(detect_vertical=False, all_texts=False, boxes_flow=None)
+
+# Total wall-clock budget for the pdfminer fallback; checked between pages
+# so one adversarial document can't stall a request for minutes.
+_PDFMINER_BUDGET_S = 10.0
+
+
+def _pdfminer_extract(buf: io.BytesIO, max_pages: Optional[int] = None) -> str:
+    """pdfminer fallback, page by page, with minimal layout analysis."""
+    output = io.StringIO()
+    manager = PDFResourceManager()
+    converter = TextConverter(manager, output, laparams=_LAPARAMS)
+    interpreter = PDFPageInterpreter(manager, converter)
+    started = time.monotonic()
+    try:
+        for page in PDFPage.get_pages(buf, maxpages=max_pages or 0):
+            if time.monotonic() - started > _PDFMINER_BUDGET_S:
+                logger.warning("pdfminer page budget exceeded after %ss, truncating", _PDFMINER_BUDGET_S)
+                break
+            interpreter.process_page(page)
+    finally:
+        converter.close()
+    return output.getvalue()
+
+# Persistent worker pool for per-page extraction: fork cost is paid once at
+# startup, not per request.
+_PAGE_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
 
 
-def extract_text_from_pdf(data: bytes) -> str:
+def _extract_page_text(data: bytes, index: int) -> str:
+    """Worker: open its own document on the raw bytes and extract one page."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc[index].get_text("text")
+
+
+def _has_form_fields(data: bytes) -> bool:
+    """Cheap in-process check for AcroForm/XFA fields."""
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return "/AcroForm" in reader.trailer["/Root"]
+    except Exception:
+        # Unreadable catalog — assume fields so the flatten path still runs.
+        return True
+
+
+def extract_text_from_pdf(
+    data: bytes,
+    max_chars: Optional[int] = None,
+    max_pages: Optional[int] = 5,
+) -> str:
     """
     Fully robust PDF text extraction.
 
-    1. Writes temp file to disk.
-    2. Flattens the PDF using Ghostscript (so form values become visible).
-    3. Extracts text with both PyPDF and pdfminer.six.
-    4. Chooses the richer text source automatically.
-    5. Cleans out (cid:xx) artifacts for better LLM parsing.
+    1. Flattens the PDF through a Ghostscript pipe only when it actually
+       contains form fields (so form values become visible); the bytes
+       never touch disk.
+    2. Extracts text with PyMuPDF (fast C path).
+    3. Falls back to pdfminer.six only when PyMuPDF returns near-empty text.
+    4. Cleans out (cid:xx) artifacts for better LLM parsing.
+
+    If ``max_chars`` is given, page extraction stops once that much text
+    has accumulated — callers that only prompt with a snippet shouldn't
+    pay for parsing a whole statement. ``max_pages`` bounds how many pages
+    are parsed at all (a 30-page Fidelity statement has everything the
+    prompt can hold in its first few pages); pass ``None`` to parse every
+    page.
     """
 
-    # --- Write bytes to temp file ---
-    temp_path = Path("/tmp/extract_input.pdf")
-    temp_path.write_bytes(data)
-    flattened_path = temp_path.with_name("extract_input_flat.pdf")
-
-    # --- Flatten with Ghostscript ---
-    print(f"[parser.extract_text_from_pdf] Flattening PDF with Ghostscript...")
-    gs_cmd = [
-        "gs",
-        "-o", str(flattened_path),
-        "-sDEVICE=pdfwrite",
-        "-dPDFSETTINGS=/prepress",
-        "-dNOPAUSE",
-        "-dBATCH",
-        str(temp_path),
-    ]
-    try:
-        subprocess.run(gs_cmd, check=True, capture_output=True)
-        print(f"[parser.extract_text_from_pdf] Flattened PDF saved to {flattened_path}")
-    except FileNotFoundError:
-        print("[parser.extract_text_from_pdf][WARN] Ghostscript not found — continuing without flattening.")
-        flattened_path = temp_path
-    except subprocess.CalledProcessError as e:
-        print(f"[parser.extract_text_from_pdf][ERROR] Ghostscript flatten failed: {e}")
-        flattened_path = temp_path
-
-    # --- Extract with PyPDF ---
-    pypdf_text = ""
-    try:
-        with open(flattened_path, "rb") as f:
-            reader = PdfReader(f)
-            pages = [(page.extract_text() or "").strip() for page in reader.pages]
-            pypdf_text = "\n".join(pages)
-        print(f"[parser.extract_text_from_pdf] PyPDF text length: {len(pypdf_text)}")
-    except Exception as e:
-        print(f"[parser.extract_text_from_pdf][WARN] PyPDF extraction failed: {e}")
+    # --- Flatten with Ghostscript only when form fields exist ---
+    flattened: Optional[bytes] = None
+    if _has_form_fields(data):
+        logger.debug("Flattening PDF with Ghostscript")
+        # stdin/stdout mode: no temp files, so concurrent requests can't
+        # clobber each other's PDFs either.
+        gs_cmd = [
+            "gs",
+            "-q",
+            "-o", "-",
+            "-sDEVICE=pdfwrite",
+            "-dPDFSETTINGS=/prepress",
+            "-dNOPAUSE",
+            "-dBATCH",
+            "-",
+        ]
+        try:
+            proc = subprocess.run(gs_cmd, input=data, check=True, capture_output=True)
+            flattened = proc.stdout
+            logger.debug("Flattened PDF (%d bytes)", len(flattened))
+        except FileNotFoundError:
+            logger.warning("Ghostscript not found — continuing without flattening")
+        except subprocess.CalledProcessError as e:
+            logger.error("Ghostscript flatten failed: %s", e)
+    else:
+        logger.debug("No form fields detected, skipping Ghostscript flatten")
 
-    # --- Extract with pdfminer ---
-    pdfminer_text = ""
+    # --- Extract with PyMuPDF ---
+    source = flattened if flattened else data
+    text = ""
     try:
-        pdfminer_text = pdfminer_extract_text(str(flattened_path))
-        print(f"[parser.extract_text_from_pdf] pdfminer text length: {len(pdfminer_text)}")
+        doc = fitz.open(stream=source, filetype="pdf")
+        try:
+            page_count = doc.page_count
+            if max_pages:
+                page_count = min(page_count, max_pages)
+            if max_chars or page_count <= 1:
+                # Sequential with the early-exit cap: stop as soon as the
+                # snippet budget is covered.
+                pages = []
+                total_chars = 0
+                for page in doc.pages(0, page_count):
+                    page_text = page.get_text("text")
+                    pages.append(page_text)
+                    total_chars += len(page_text)
+                    if max_chars and total_chars >= max_chars:
+                        logger.debug("Stopping early at %d chars (cap %d)", total_chars, max_chars)
+                        break
+                text = "\n".join(pages)
+            else:
+                # Uncapped multi-page extraction: fan pages out to the
+                # persistent pool and rejoin in page order.
+                pages = list(
+                    _PAGE_POOL.map(_extract_page_text, [source] * page_count, range(page_count))
+                )
+                text = "\n".join(pages)
+        finally:
+            doc.close()
+        logger.debug("PyMuPDF text length: %d", len(text))
     except Exception as e:
-        print(f"[parser.extract_text_from_pdf][ERROR] pdfminer extraction failed: {e}")
+        logger.warning("PyMuPDF extraction failed: %s", e)
 
-    # --- Choose the better output ---
-    if len(pdfminer_text.strip()) > len(pypdf_text.strip()) * 1.25:
-        print("[parser.extract_text_from_pdf] Using pdfminer text (more complete).")
-        text = pdfminer_text
-    else:
-        print("[parser.extract_text_from_pdf] Combining PyPDF + pdfminer output.")
-        text = pypdf_text + "\n\n" + pdfminer_text
+    # --- Fallback to pdfminer only when PyMuPDF's output isn't usable ---
+    if not _is_rich(text):
+        logger.debug("PyMuPDF text too sparse or CID-heavy, falling back to pdfminer")
+        try:
+            text = _pdfminer_extract(io.BytesIO(source), max_pages=max_pages)
+            logger.debug("pdfminer text length: %d", len(text))
+        except Exception as e:
+            logger.error("pdfminer extraction failed: %s", e)
 
     # --- Cleanup CID noise ---
-    text = re.sub(r"\(cid:\d+\)", "", text)
-    text = " ".join(text.split())
+    text = _CID_RE.sub("", text)
+    # Single-pass whitespace collapse; " ".join(text.split()) would build
+    # a full token list first.
+    text = _WS_RE.sub(" ", text).strip()
 
-    print(f"[parser.extract_text_from_pdf] Final cleaned text length: {len(text)}")
-    return text
\ No newline at end of file
+    logger.debug("Final cleaned text length: %d", len(text))
+    return text
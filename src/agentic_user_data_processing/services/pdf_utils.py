@@ -1,10 +1,14 @@
 """
 PDF utility helpers for preprocessing user uploads.
 """
+import shutil
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
+
+# Chunk size used when copying streams; keeps peak memory per upload bounded.
+COPY_CHUNK_SIZE = 1024 * 1024
 
 
 def flatten_pdf(data: bytes) -> bytes:
@@ -44,3 +48,58 @@ def flatten_pdf(data: bytes) -> bytes:
             Path(src_file.name).unlink(missing_ok=True)
         if dst_file:
             Path(dst_file.name).unlink(missing_ok=True)
+
+
+def flatten_pdf_stream(fileobj: BinaryIO) -> BinaryIO:
+    """
+    Streaming variant of flatten_pdf for seekable file objects.
+
+    Copies the input to a temp file in chunks, flattens it with pdftk, and
+    returns a seekable spooled file holding the flattened output, rewound to
+    the start. Returns the original stream (rewound) if the input is not a
+    PDF or pdftk is unavailable/fails, so peak memory stays ~one chunk
+    instead of the whole document.
+    """
+    fileobj.seek(0)
+    header = fileobj.read(4)
+    fileobj.seek(0)
+    if header != b"%PDF":
+        return fileobj
+
+    src_path: Optional[Path] = None
+    dst_path: Optional[Path] = None
+
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as src_file:
+            src_path = Path(src_file.name)
+            shutil.copyfileobj(fileobj, src_file, COPY_CHUNK_SIZE)
+
+        dst_file = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        dst_file.close()
+        dst_path = Path(dst_file.name)
+
+        subprocess.run(
+            ["pdftk", str(src_path), "output", str(dst_path)],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        if dst_path.stat().st_size == 0:
+            fileobj.seek(0)
+            return fileobj
+
+        flattened = tempfile.SpooledTemporaryFile(max_size=COPY_CHUNK_SIZE, suffix=".pdf")
+        with open(dst_path, "rb") as out:
+            shutil.copyfileobj(out, flattened, COPY_CHUNK_SIZE)
+        flattened.seek(0)
+        return flattened
+
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        fileobj.seek(0)
+        return fileobj
+    finally:
+        if src_path:
+            src_path.unlink(missing_ok=True)
+        if dst_path:
+            dst_path.unlink(missing_ok=True)
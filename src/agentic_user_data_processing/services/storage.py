@@ -1,15 +1,17 @@
 """
 Utilities for persisting user documents in Google Cloud Storage.
 """
+import functools
 import os
 import json
+import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Final
+from typing import BinaryIO, Optional, Final
 import logging
 
+import requests.adapters
 from google.cloud import storage
-from google.api_core.exceptions import NotFound
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,31 +23,46 @@ KEY_PATH = os.getenv("BUCKET_CREDENTIALS")
 LOCAL_FALLBACK_DIR = Path("local_user_uploads")
 
 
+@functools.lru_cache(maxsize=1)
 def _get_gcs_client():
+    """
+    Process-wide storage client (same lru_cache pattern as services.llm).
+
+    Per-call construction re-parsed the key file and rebuilt auth sessions
+    and connection pools on every upload. The shared client gets a larger
+    HTTP adapter so concurrent blob operations reuse pooled TLS connections.
+    """
     if not BUCKET_NAME or not KEY_PATH or not Path(KEY_PATH).exists():
         raise RuntimeError("GCS credentials or bucket not configured properly")
-    return storage.Client.from_service_account_json(KEY_PATH)
+    client = storage.Client.from_service_account_json(KEY_PATH)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=32)
+    client._http.mount("https://", adapter)
+    return client
 
-def _load_session_metadata(bucket, session_id:str) -> list:
-    """Load metadata.json for a session from GCS if it exists, else return empty list."""
-    metadata_blob = bucket.blob(f"user_uploads/{session_id}/metadata.json")
-    try:
-        data = metadata_blob.download_as_text()
-        return json.loads(data)
-    except NotFound:
-        logging.info(f"No existing metadata.json found for session {session_id}, creating new file")
-        return []
-    except Exception as e:
-        logging.warning(f"Failed to load metadata.json for {session_id}: {e}")
+def _write_upload_metadata(bucket, session_id: str, timestamp: str, filename: str, entry: dict):
+    """
+    Write one upload's metadata as its own tiny blob.
 
-def _save_session_metadata(bucket, session_id: str, metadata_list: list):
-    """Upload the updated metadata list as JSON to GCS"""
-    metadata_blob = bucket.blob(f"user_uploads/{session_id}/metadata.json")
-    metadata_blob.upload_from_string(
-        json.dumps(metadata_list, indent=2),
-        content_type='application/json'
-    )
-    logging.info(f"Updated metadata.json for session: {session_id}")
+    Append-only: no read-modify-write of a shared metadata.json, so
+    concurrent uploads can't lose each other's entries and each upload
+    costs one PUT instead of a GET + PUT.
+    """
+    blob = bucket.blob(f"user_uploads/{session_id}/metadata/{timestamp}_{filename}.json")
+    blob.upload_from_string(json.dumps(entry), content_type='application/json')
+    logging.info(f"Wrote upload metadata for session: {session_id}")
+
+
+def list_session_metadata(session_id: str) -> list:
+    """Collect the per-upload metadata blobs for a session into one list."""
+    client = _get_gcs_client()
+    bucket = client.bucket(BUCKET_NAME)
+    entries = []
+    for blob in bucket.list_blobs(prefix=f"user_uploads/{session_id}/metadata/"):
+        try:
+            entries.append(json.loads(blob.download_as_text()))
+        except Exception as e:
+            logging.warning(f"Failed to read metadata blob {blob.name}: {e}")
+    return entries
 
 def save_document_bytes(
     session_id: str,
@@ -74,8 +91,7 @@ def save_document_bytes(
         gcs_uri=f"gs://{BUCKET_NAME}/{object_name}"
         logging.info(f"Uploaded {filename} to {gcs_uri}")
 
-        metadata = _load_session_metadata(bucket, session_id)
-        metadata.append({
+        _write_upload_metadata(bucket, session_id, timestamp, filename, {
             "filename": filename,
             "gcs_path": gcs_uri,
             "timestamp": timestamp,
@@ -83,8 +99,6 @@ def save_document_bytes(
             "size_bytes": len(contents),
         })
 
-        _save_session_metadata(bucket, session_id, metadata)
-
         return gcs_uri
     except Exception as e:
         logging.error(f"GCS upload failed: {e}. Falling back to local storage.")
@@ -94,3 +108,52 @@ def save_document_bytes(
         local_path.write_bytes(contents)
         logging.info(f"Stored Locally at {local_path}")
         return local_path.as_posix()
+
+
+def save_document_stream(
+    session_id: str,
+    filename: str,
+    fileobj: BinaryIO,
+    content_type: Optional[str] = None,
+) -> str:
+    """
+    Streaming variant of save_document_bytes for seekable file objects.
+
+    Uploads straight from the file handle so the document is never fully
+    buffered in memory. Falls back to copying the stream to local disk when
+    GCS is unavailable, mirroring save_document_bytes.
+    """
+    if not filename:
+        filename = "document.pdf"
+    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    object_name = f"sessions/{session_id}/{timestamp}_{filename}"
+
+    try:
+        client = _get_gcs_client()
+        bucket = client.bucket(BUCKET_NAME)
+        blob = bucket.blob(object_name)
+
+        blob.upload_from_file(fileobj, content_type=content_type, rewind=True)
+        size_bytes = fileobj.tell()
+        gcs_uri = f"gs://{BUCKET_NAME}/{object_name}"
+        logging.info(f"Uploaded {filename} to {gcs_uri}")
+
+        _write_upload_metadata(bucket, session_id, timestamp, filename, {
+            "filename": filename,
+            "gcs_path": gcs_uri,
+            "timestamp": timestamp,
+            "content_type": content_type or "application/octet-stream",
+            "size_bytes": size_bytes,
+        })
+
+        return gcs_uri
+    except Exception as e:
+        logging.error(f"GCS upload failed: {e}. Falling back to local storage.")
+
+        LOCAL_FALLBACK_DIR.mkdir(parents=True, exist_ok=True)
+        local_path = LOCAL_FALLBACK_DIR / object_name.replace("/", "_")
+        fileobj.seek(0)
+        with open(local_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        logging.info(f"Stored Locally at {local_path}")
+        return local_path.as_posix()
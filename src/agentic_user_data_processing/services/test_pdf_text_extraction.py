@@ -1,6 +1,6 @@
 """
 Robust PDF text extraction test with Ghostscript flattening,
-PyPDF + pdfminer fallback, and CID cleanup.
+PyMuPDF extraction with pdfminer fallback, and CID cleanup.
 
 Use this to verify that numeric/text field values in 1099 or W-2 PDFs
 are truly visible after flattening.
@@ -10,7 +10,8 @@ import subprocess
 import io
 import re
 from pathlib import Path
-from pypdf import PdfReader
+
+import fitz
 from pdfminer.high_level import extract_text as pdfminer_extract_text
 
 
@@ -18,6 +19,10 @@ from pdfminer.high_level import extract_text as pdfminer_extract_text
 INPUT_PDF = Path("src/synthetic_data/int_1099/outputs/1099int_003.pdf")
 FLATTENED_PDF = INPUT_PDF.with_name(INPUT_PDF.stem + "_flat.pdf")
 
+# Compiled once, mirroring services/parser.py
+CID_RE = re.compile(r"\(cid:\d+\)")
+WS_RE = re.compile(r"\s+")
+
 
 # === STEP 1: Flatten PDF with Ghostscript ===
 def flatten_pdf(input_path: Path, output_path: Path):
@@ -43,40 +48,32 @@ def flatten_pdf(input_path: Path, output_path: Path):
         exit(1)
 
 
-# === STEP 2: Text extraction (PyPDF + pdfminer) ===
+# === STEP 2: Text extraction (PyMuPDF + pdfminer fallback) ===
 def extract_text_from_pdf(path: Path) -> str:
-    """Extract text robustly and prefer pdfminer output when richer."""
-    # --- PyPDF pass ---
-    try:
-        buffer = io.BytesIO(path.read_bytes())
-        reader = PdfReader(buffer)
-        pypdf_text = "\n".join(
-            (page.extract_text() or "").strip() for page in reader.pages
-        )
-        print(f"[INFO] PyPDF text length: {len(pypdf_text)}")
-    except Exception as e:
-        print(f"[WARN] PyPDF extraction failed: {e}")
-        pypdf_text = ""
-
-    # --- Always try pdfminer ---
+    """Extract text with PyMuPDF, falling back to pdfminer when sparse."""
+    # --- PyMuPDF pass ---
     try:
-        pdfminer_text = pdfminer_extract_text(str(path))
-        print(f"[INFO] pdfminer text length: {len(pdfminer_text)}")
+        doc = fitz.open(path)
+        try:
+            text = "\n".join(page.get_text("text") for page in doc)
+        finally:
+            doc.close()
+        print(f"[INFO] PyMuPDF text length: {len(text)}")
     except Exception as e:
-        print(f"[ERROR] pdfminer.six extraction failed: {e}")
-        pdfminer_text = ""
+        print(f"[WARN] PyMuPDF extraction failed: {e}")
+        text = ""
 
-    # --- Decide which to keep ---
-    if len(pdfminer_text.strip()) > len(pypdf_text.strip()) * 1.25:
-        print("[INFO] Using pdfminer text (more complete).")
-        combined_text = pdfminer_text
-    else:
-        print("[INFO] Using combined text output (pypdf + pdfminer).")
-        combined_text = pypdf_text + "\n\n" + pdfminer_text
+    # --- pdfminer only when PyMuPDF came up near-empty ---
+    if len(text.strip()) < 200:
+        try:
+            text = pdfminer_extract_text(str(path))
+            print(f"[INFO] pdfminer text length: {len(text)}")
+        except Exception as e:
+            print(f"[ERROR] pdfminer.six extraction failed: {e}")
 
     # --- Clean up CID artifacts like (cid:0) ---
-    combined_text = re.sub(r"\(cid:\d+\)", "", combined_text)
-    return combined_text
+    text = CID_RE.sub("", text)
+    return text
 
 
 # === MAIN TEST ===
@@ -87,7 +84,7 @@ if __name__ == "__main__":
 
     text = extract_text_from_pdf(FLATTENED_PDF)
 
-    text_clean = " ".join(text.split())
+    text_clean = WS_RE.sub(" ", text).strip()
     print(f"[INFO] Raw text length before cleaning: {len(text)}")
     print(f"[SUCCESS] Extracted {len(text_clean)} characters after cleaning.\n")
 
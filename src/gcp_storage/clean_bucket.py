@@ -24,7 +24,7 @@ def clean_scraped_data():
     
     # List files first
     print(f"Looking for files under {prefix}...")
-    files = client.list_files(prefix=prefix)
+    files = list(client.list_files(prefix=prefix))
     
     if not files:
         print("No files found to delete.")
@@ -45,22 +45,12 @@ def clean_scraped_data():
         print("Cancelled. No files were deleted.")
         return
     
-    # Delete files
+    # Delete files in batches of 100 (one GCS batch request each)
     print()
     print("Deleting files...")
-    deleted = 0
-    failed = 0
-    
-    for file_path in files:
-        if client.delete_file(file_path):
-            deleted += 1
-        else:
-            failed += 1
-        
-        # Progress indicator
-        if (deleted + failed) % 10 == 0:
-            print(f"  Progress: {deleted + failed}/{len(files)}")
-    
+    deleted = client.delete_files(files)
+    failed = len(files) - deleted
+
     print()
     print("=" * 70)
     print(f"Deletion Complete!")
@@ -1,61 +1,185 @@
 """GCS Client for FinWhiz - Interact with Google Cloud Storage"""
 
+import base64
+import functools
+import hashlib
 import logging
+import multiprocessing
+import os
+import shutil
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List
 
+import google_crc32c
+import requests.adapters
 from google.cloud import storage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+if google_crc32c.implementation != 'c':
+    # The pure-Python fallback is orders of magnitude slower than the
+    # SSE4.2-accelerated extension and puts checksumming on the upload
+    # critical path.
+    logger.warning("google-crc32c C extension not available; using slow pure-Python CRC32C")
+
+# Per-worker-process client, created lazily on first upload. storage.Client
+# doesn't survive fork, so each pool worker builds (and keeps) its own.
+_worker_client = None
+
+
+@functools.lru_cache(maxsize=4)
+def _shared_client(project_id: str) -> storage.Client:
+    """One storage.Client per project, shared by every GCSClient instance.
+
+    Each Client carries its own auth session and connection pool; creating
+    one per GCSClient re-fetches tokens and re-opens TLS connections. The
+    pool is widened so concurrent listing/metadata calls from one process
+    don't queue behind urllib3's default 10 connections.
+    """
+    client = storage.Client(project=project_id)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=64)
+    client._http.mount("https://", adapter)
+    return client
+
+
+def _upload_unchunked(blob, local_path: str, attempts: int = 5) -> None:
+    """Single-request upload with the library's per-chunk retry disabled.
+
+    Retrying whole small files here is cheaper than carrying a 16 MiB
+    retry buffer per in-flight upload across 64 pool workers. Failed
+    attempts back off exponentially (1s, 2s, 4s, 8s) before reraising.
+    """
+    for attempt in range(attempts):
+        try:
+            blob.upload_from_filename(local_path, checksum=None, retry=None)
+            return
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _local_crc32c(path: str) -> str:
+    """Base64 CRC32C of a local file, matching the GCS crc32c metadata field."""
+    checksum = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode('ascii')
+
+
+def _local_md5(path: str) -> str:
+    """Base64 MD5 of a local file, matching the GCS md5Hash metadata field."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode('ascii')
+
+
+def _upload_one(task) -> bool:
+    """Pool worker: upload a single file with the per-process client."""
+    bucket_name, project_id, local_path, gcs_path = task
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = storage.Client(project=project_id)
+    try:
+        _worker_client.bucket(bucket_name).blob(gcs_path).upload_from_filename(local_path)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to upload {local_path}: {e}")
+        return False
+
 
 class GCSClient:
     """Client for Google Cloud Storage operations"""
     
-    def __init__(self, bucket_name: str = "finwhiz-storage", project_id: str = "finwhiz-ac215"):
+    def __init__(
+        self,
+        bucket_name: str = "finwhiz-storage",
+        project_id: str = "finwhiz-ac215",
+        max_workers: int = 64,
+    ):
         """
         Initialize GCS client
-        
+
         Args:
             bucket_name: GCS bucket name
             project_id: GCP project ID
+            max_workers: Worker processes for bulk folder uploads
         """
         self.bucket_name = bucket_name
         self.project_id = project_id
-        self.client = storage.Client(project=project_id)
+        self.max_workers = max_workers
+        self.client = _shared_client(project_id)
         self.bucket = self.client.bucket(bucket_name)
-        
+
         logger.info(f"Initialized GCS client for bucket: {bucket_name}")
-    
-    def upload_file(self, local_path: str, gcs_path: str) -> bool:
+
+    @functools.cached_property
+    def exists(self) -> bool:
+        """Whether the bucket exists — probed once per client, then cached."""
+        return self.bucket.exists()
+
+    def upload_file(self, local_path: str, gcs_path: str, chunked: bool = True) -> bool:
         """
         Upload a file to GCS
-        
+
         Args:
             local_path: Path to local file
             gcs_path: Destination path in bucket (e.g., 'base-knowledge/data.json')
-        
+            chunked: If False, send in one request with library retries
+                disabled and retry the whole upload at the job level instead
+
         Returns:
             True if successful
         """
         try:
             blob = self.bucket.blob(gcs_path)
-            blob.upload_from_filename(local_path)
+            size = os.stat(local_path).st_size
+            # Precomputed hardware CRC32C lets the server validate the
+            # upload end-to-end without the library hashing in Python.
+            blob.crc32c = _local_crc32c(local_path)
+            if not chunked:
+                blob.chunk_size = None
+                _upload_unchunked(blob, local_path)
+            elif size < 5 * 1024 * 1024:
+                # Most scraped fragments are tiny: single-request upload, no
+                # resumable session and no default 16 MiB retry buffer.
+                blob.chunk_size = None
+                blob.upload_from_filename(local_path, checksum=None)
+            elif size < 16 * 1024 * 1024:
+                # Size the buffer to the file (rounded up to the 256 KiB
+                # granularity GCS requires) instead of a full 16 MiB.
+                blob.chunk_size = -(-size // (256 * 1024)) * (256 * 1024)
+                blob.upload_from_filename(local_path, checksum=None)
+            else:
+                # Large shards: stream 16 MiB-aligned reads straight into
+                # the resumable writer instead of buffering the whole file,
+                # so the network send overlaps the file read with a single
+                # buffer in flight.
+                with open(local_path, 'rb') as src, blob.open(
+                    'wb', chunk_size=16 * 1024 * 1024, ignore_flush=True
+                ) as w:
+                    shutil.copyfileobj(src, w, length=16 * 1024 * 1024)
             logger.info(f"Uploaded {local_path} -> gs://{self.bucket_name}/{gcs_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to upload {local_path}: {e}")
             return False
     
-    def upload_folder(self, local_folder: str, gcs_prefix: str) -> int:
+    def upload_folder(self, local_folder: str, gcs_prefix: str, skip_existing: bool = False) -> int:
         """
         Upload entire folder to GCS recursively
-        
+
         Args:
             local_folder: Local folder path
             gcs_prefix: Prefix in bucket (e.g., 'base-knowledge/scraped-data/')
-        
+            skip_existing: Skip files already in the bucket with the same
+                size and MD5 (one listing request instead of re-uploading)
+
         Returns:
             Number of files uploaded
         """
@@ -63,18 +187,107 @@ class GCSClient:
         if not local_path.exists():
             logger.error(f"Folder not found: {local_folder}")
             return 0
-        
-        count = 0
-        for file_path in local_path.rglob('*'):
-            if file_path.is_file():
-                relative_path = file_path.relative_to(local_path)
-                gcs_path = f"{gcs_prefix.rstrip('/')}/{relative_path}"
-                
-                if self.upload_file(str(file_path), gcs_path):
+
+        # One listing of the destination prefix up front beats a per-file
+        # existence check; size is compared first so the MD5 is only
+        # computed for files that could actually match.
+        existing: Dict[str, tuple] = {}
+        if skip_existing:
+            for blob in self.client.list_blobs(
+                self.bucket,
+                prefix=gcs_prefix.rstrip('/') + '/',
+                fields="items(name,size,md5Hash),nextPageToken",
+            ):
+                existing[blob.name] = (blob.size, blob.md5_hash)
+
+        # os.fwalk hands back each directory's fd alongside its entries, so
+        # files are stat'd relative to that fd (one openat per file) instead
+        # of re-walking the path for every rglob()/is_file()/stat() call.
+        prefix = gcs_prefix.rstrip('/')
+        skipped = appended = 0
+        tasks = []
+        for dirpath, _, filenames, dfd in os.fwalk(local_folder):
+            rel = os.path.relpath(dirpath, local_folder)
+            for name in filenames:
+                full_path = os.path.join(dirpath, name)
+                gcs_path = f"{prefix}/{name}" if rel == '.' else f"{prefix}/{rel}/{name}"
+                if gcs_path in existing:
+                    remote_size, remote_md5 = existing[gcs_path]
+                    local_size = os.stat(name, dir_fd=dfd).st_size
+                    if (local_size == remote_size
+                            and _local_md5(full_path) == remote_md5):
+                        skipped += 1
+                        continue
+                    # Rerun scrapes mostly append records; if the remote
+                    # object is a byte prefix of the local file, upload only
+                    # the tail and stitch server-side instead of resending
+                    # the unchanged portion.
+                    if (gcs_path.endswith('.ndjson')
+                            and local_size > remote_size
+                            and self._append_tail(full_path, gcs_path,
+                                                  remote_size, remote_md5)):
+                        appended += 1
+                        continue
+                tasks.append((self.bucket_name, self.project_id, full_path, gcs_path))
+
+        if skipped:
+            logger.info(f"Skipped {skipped} files already in gs://{self.bucket_name}/{gcs_prefix}")
+        if appended:
+            logger.info(f"Appended deltas to {appended} files in gs://{self.bucket_name}/{gcs_prefix}")
+
+        if not tasks:
+            return appended
+
+        # Each upload is RTT-bound, so fan the files out across worker
+        # processes; a single worker would leave the link idle per file.
+        count = appended
+        with multiprocessing.Pool(min(self.max_workers, len(tasks))) as pool:
+            for ok in pool.imap_unordered(_upload_one, tasks, chunksize=16):
+                if ok:
                     count += 1
-        
+
         logger.info(f"Uploaded {count} files from {local_folder}")
         return count
+
+    def _append_tail(self, local_path: str, gcs_path: str,
+                     remote_size: int, remote_md5: str) -> bool:
+        """
+        Append the local byte tail to an existing blob via the compose API
+
+        Verifies the remote object is an exact byte prefix of the local file
+        (MD5 of the first remote_size local bytes vs the remote md5Hash),
+        uploads only the bytes past remote_size as a temporary blob, and
+        stitches the two server-side with compose. Returns False — caller
+        falls back to a full upload — if the prefix check fails or any step
+        errors.
+        """
+        tail_blob = self.bucket.blob(f"{gcs_path}.append.tmp")
+        try:
+            with open(local_path, 'rb') as f:
+                digest = hashlib.md5()
+                remaining = remote_size
+                while remaining > 0:
+                    block = f.read(min(1024 * 1024, remaining))
+                    if not block:
+                        return False
+                    digest.update(block)
+                    remaining -= len(block)
+                if base64.b64encode(digest.digest()).decode('ascii') != remote_md5:
+                    return False
+                # f is positioned at remote_size: only the delta goes out
+                tail_blob.upload_from_file(f, rewind=False)
+            target = self.bucket.blob(gcs_path)
+            target.compose([target, tail_blob])
+            tail_blob.delete()
+            logger.info(f"Appended delta to gs://{self.bucket_name}/{gcs_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Compose append failed for {gcs_path}, falling back to full upload: {e}")
+            try:
+                tail_blob.delete()
+            except Exception:
+                pass
+            return False
     
     def download_file(self, gcs_path: str, local_path: str) -> bool:
         """
@@ -89,25 +302,43 @@ class GCSClient:
         """
         try:
             blob = self.bucket.blob(gcs_path)
-            blob.download_to_filename(local_path)
+            # raw_download skips decompressive transcoding of gzip-encoded
+            # objects, so bytes land on disk exactly as stored.
+            blob.download_to_filename(local_path, raw_download=True)
             logger.info(f"Downloaded gs://{self.bucket_name}/{gcs_path} -> {local_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to download {gcs_path}: {e}")
             return False
     
-    def list_files(self, prefix: str = "") -> List[str]:
+    def list_files(self, prefix: str = "", page_size: int = 1000,
+                   match_glob: str = None) -> Iterator[str]:
         """
-        List files in bucket with optional prefix
-        
+        Lazily list files in bucket with optional prefix
+
+        Only the names are requested (fields projection), so responses are
+        a fraction of the default metadata payload, and results stream page
+        by page instead of materializing the whole listing. Callers that
+        need a list can wrap in list(...).
+
         Args:
             prefix: Filter by prefix (e.g., 'base-knowledge/')
-        
+            page_size: Results fetched per API page
+            match_glob: Server-side glob filter (e.g., '**/*.ndjson') —
+                cheaper than filtering names in Python after the fact
+
         Returns:
-            List of file paths
+            Iterator of file paths
         """
-        blobs = self.bucket.list_blobs(prefix=prefix)
-        return [blob.name for blob in blobs]
+        blobs = self.client.list_blobs(
+            self.bucket,
+            prefix=prefix,
+            match_glob=match_glob,
+            fields="items(name),nextPageToken",
+            page_size=page_size,
+        )
+        for blob in blobs:
+            yield blob.name
     
     def file_exists(self, gcs_path: str) -> bool:
         """
@@ -122,13 +353,56 @@ class GCSClient:
         blob = self.bucket.blob(gcs_path)
         return blob.exists()
     
+    def _batched_responses(self, gcs_paths: List[str], request):
+        """
+        Issue one request per path, packed into batches of 100
+
+        Calls ``request(blob)`` for each path with the requests deferred
+        into a multipart batch, and yields ``(path, subresponse)`` pairs.
+        The batch is driven explicitly (push, defer, pop, finish) rather
+        than via the context manager because finish() is what hands back
+        the subresponses — DELETE requests in particular leave no trace on
+        the blob objects, so there is nowhere else to read per-object
+        outcomes from.
+        """
+        for i in range(0, len(gcs_paths), 100):
+            chunk = gcs_paths[i:i + 100]
+            batch = self.client.batch(raise_exception=False)
+            self.client._push_batch(batch)
+            try:
+                for path in chunk:
+                    request(self.bucket.blob(path))
+            finally:
+                self.client._pop_batch()
+            yield from zip(chunk, batch.finish(raise_exception=False))
+
+    def files_exist(self, gcs_paths: List[str]) -> Dict[str, bool]:
+        """
+        Check existence of many files with batched requests
+
+        Packs up to 100 metadata GETs into one multipart round trip instead
+        of one HTTP request per path.
+
+        Args:
+            gcs_paths: Paths to check
+
+        Returns:
+            Mapping of path -> exists
+        """
+        return {
+            path: 200 <= response.status_code < 300
+            for path, response in self._batched_responses(
+                gcs_paths, lambda blob: blob.reload()
+            )
+        }
+
     def delete_file(self, gcs_path: str) -> bool:
         """
         Delete a file from GCS
-        
+
         Args:
             gcs_path: Path to file
-        
+
         Returns:
             True if successful
         """
@@ -141,9 +415,34 @@ class GCSClient:
             logger.error(f"Failed to delete {gcs_path}: {e}")
             return False
 
+    def delete_files(self, gcs_paths: List[str]) -> int:
+        """
+        Delete many files using GCS batch requests
+
+        Sends one multipart request per 100 objects instead of one HTTP
+        round-trip per file. Per-object failures are logged and don't stop
+        the remaining deletes.
+
+        Args:
+            gcs_paths: Paths to delete
+
+        Returns:
+            Number of files deleted
+        """
+        deleted = 0
+        for path, response in self._batched_responses(
+            gcs_paths, lambda blob: blob.delete()
+        ):
+            if 200 <= response.status_code < 300:
+                deleted += 1
+            else:
+                logger.error(f"Failed to delete {path}: HTTP {response.status_code}")
+        logger.info(f"Deleted {deleted}/{len(gcs_paths)} files from gs://{self.bucket_name}")
+        return deleted
+
 
 if __name__ == "__main__":
     # Quick test
     client = GCSClient()
     print(f"Connected to bucket: {client.bucket_name}")
-    print(f"Bucket exists: {client.bucket.exists()}")
\ No newline at end of file
+    print(f"Bucket exists: {client.exists}")
\ No newline at end of file
@@ -23,9 +23,9 @@ def test_gcs():
     # Initialize client
     client = GCSClient(bucket_name="finwhiz-storage", project_id="finwhiz-ac215")
     
-    # Test 1: Bucket exists
+    # Test 1: Bucket exists (cached on the client, one GET per run)
     print("Test 1: Check bucket exists")
-    if client.bucket.exists():
+    if client.exists:
         print("PASS: Bucket exists\n")
     else:
         print("FAIL: Bucket not found\n")
@@ -47,7 +47,7 @@ def test_gcs():
     
     # Test 4: List files
     print("Test 4: List files in test/ folder")
-    files = client.list_files(prefix="test/")
+    files = list(client.list_files(prefix="test/"))
     print(f"PASS: Found {len(files)} file(s)")
     for file in files:
         print(f"  - {file}")
@@ -12,13 +12,64 @@ Usage:
     python upload_all_scraped_data.py --list
 """
 
+import itertools
+import os
 import sys
 import argparse
+import tarfile
 from pathlib import Path
 
 from gcs_client import GCSClient
 
 
+def classify_files(folder):
+    """Classify a source folder's files by suffix in one directory scan.
+
+    Returns (ndjson, json_gz, jsonl_gz) path lists; repeated glob() calls
+    would re-walk the directory once per pattern.
+    """
+    ndjson, json_gz, jsonl_gz = [], [], []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            if name.endswith('.ndjson'):
+                ndjson.append(entry.path)
+            elif name.endswith('.jsonl.gz'):
+                jsonl_gz.append(entry.path)
+            elif name.endswith('.json.gz'):
+                json_gz.append(entry.path)
+    return ndjson, json_gz, jsonl_gz
+
+
+def pack_and_upload(client: GCSClient, source_path, gcs_prefix: str) -> int:
+    """Tar a source folder into one .tar.zst object streamed straight to GCS.
+
+    Uploading hundreds of tiny NDJSON files is round-trip-bound: every file
+    pays a full request regardless of size. Packing collapses them into a
+    single streamed upload, and zstd compresses the repetitive JSON on the
+    way out. Nothing is staged on local disk.
+
+    Returns the number of files packed.
+    """
+    # Imported here so only the --pack path needs the zstandard package
+    import zstandard
+
+    blob = client.bucket.blob(f"{gcs_prefix.rstrip('/')}.tar.zst")
+    count = 0
+    with blob.open('wb') as raw:
+        with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as zst:
+            with tarfile.open(fileobj=zst, mode='w|') as tar:
+                with os.scandir(source_path) as it:
+                    for entry in sorted(it, key=lambda e: e.name):
+                        if entry.is_file():
+                            tar.add(entry.path, arcname=entry.name)
+                            count += 1
+    print(f"  Packed {count} files into gs://{client.bucket_name}/{gcs_prefix.rstrip('/')}.tar.zst")
+    return count
+
+
 def find_scraped_data():
     """Find the scraped data directory."""
     possible_paths = [
@@ -44,15 +95,14 @@ def list_available_sources(data_root: Path):
     for folder in data_root.iterdir():
         if folder.is_dir():
             # Check if it has .ndjson or .json.gz files
-            ndjson_files = list(folder.glob('*.ndjson'))
-            json_gz_files = list(folder.glob('*.json.gz'))
+            ndjson_files, json_gz_files, _ = classify_files(folder)
             if ndjson_files or json_gz_files:
                 sources.append(folder.name)
-    
+
     return sorted(sources)
 
 
-def upload_all_scraped_data(selected_sources=None):
+def upload_all_scraped_data(selected_sources=None, skip_existing=True, pack=False):
     """Upload all or selected scraped data from sources to GCS"""
     
     print("=" * 70)
@@ -119,9 +169,7 @@ def upload_all_scraped_data(selected_sources=None):
         
         # Check for NDJSON and JSON.GZ files (flat structure)
        # NEW - checks .ndjson, .json.gz, and .jsonl.gz:
-        ndjson_files = list(source_path.glob('*.ndjson'))
-        json_gz_files = list(source_path.glob('*.json.gz'))
-        jsonl_gz_files = list(source_path.glob('*.jsonl.gz'))
+        ndjson_files, json_gz_files, jsonl_gz_files = classify_files(source_path)
         all_files = ndjson_files + json_gz_files + jsonl_gz_files
 
         if not all_files:
@@ -133,10 +181,14 @@ def upload_all_scraped_data(selected_sources=None):
         print(f"  GCS:    gs://{client.bucket_name}/{gcs_prefix}/")
         print(f"  Files:  {len(ndjson_files)} .ndjson + {len(json_gz_files)} .json.gz + {len(jsonl_gz_files)} .jsonl.gz file(s)")
         
-        count = client.upload_folder(
-            local_folder=str(source_path),
-            gcs_prefix=gcs_prefix
-        )
+        if pack:
+            count = pack_and_upload(client, source_path, gcs_prefix)
+        else:
+            count = client.upload_folder(
+                local_folder=str(source_path),
+                gcs_prefix=gcs_prefix,
+                skip_existing=skip_existing
+            )
         
         total_uploaded += count
         uploaded_sources.append(source_name)
@@ -151,20 +203,26 @@ def upload_all_scraped_data(selected_sources=None):
     print("=" * 70)
     print()
     
-    # Verify upload
+    # Verify upload with a capped sample — a full listing of a large
+    # bucket just to print 15 names costs seconds and megabytes.
     if total_uploaded > 0:
         print("Verifying upload...")
-        files = client.list_files(prefix="base-knowledge/scraped-data/")
-        print(f"Total files in GCS: {len(files)}")
+        # Server-side glob: only data files come back, filtered in the API
+        files = list(itertools.islice(client.list_files(
+            prefix="base-knowledge/scraped-data/",
+            match_glob="**/*.{ndjson,json.gz,jsonl.gz}",
+            page_size=16,
+        ), 16))
+        print(f"Files in GCS: {'16+' if len(files) == 16 else len(files)}")
         print()
-        
+
         if files:
             print("Sample files uploaded:")
             for file in files[:15]:
                 print(f"  - {file}")
             if len(files) > 15:
-                print(f"  ... and {len(files) - 15} more")
-        
+                print("  ...")
+
         print()
         print("SUCCESS: Data uploaded to GCS")
         print(f"View in console:")
@@ -200,6 +258,17 @@ Examples:
         action="store_true",
         help="List available sources and exit"
     )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Tar each source into a single .tar.zst object instead of uploading files individually"
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Skip files already in GCS with matching size and MD5"
+    )
     return parser.parse_args()
 
 
@@ -217,10 +286,8 @@ if __name__ == "__main__":
             sources = list_available_sources(data_root)
             if sources:
                 for source in sources:
-                    source_path = data_root / source
-                    ndjson_count = len(list(source_path.glob('*.ndjson')))
-                    gz_count = len(list(source_path.glob('*.json.gz')))
-                    print(f"  - {source}: {ndjson_count} .ndjson + {gz_count} .json.gz files")
+                    ndjson_files, json_gz_files, _ = classify_files(data_root / source)
+                    print(f"  - {source}: {len(ndjson_files)} .ndjson + {len(json_gz_files)} .json.gz files")
             else:
                 print("  No sources found with .ndjson or .json.gz files")
         else:
@@ -229,4 +296,8 @@ if __name__ == "__main__":
         sys.exit(0)
     
     # Upload selected or all sources
-    upload_all_scraped_data(selected_sources=args.sources)
\ No newline at end of file
+    upload_all_scraped_data(
+        selected_sources=args.sources,
+        skip_existing=args.skip_existing,
+        pack=args.pack,
+    )
\ No newline at end of file
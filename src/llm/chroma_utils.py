@@ -1,10 +1,23 @@
+import functools
 import os
 import logging
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Above this size a single GET is bandwidth-limited; slice the blob into
+# ranged GETs downloaded in parallel instead.
+LARGE_BLOB_BYTES = 32 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 16 * 1024 * 1024
+
+@functools.lru_cache(maxsize=1)
+def _get_storage_client() -> storage.Client:
+    """Shared storage client: one auth handshake and connection pool per process."""
+    return storage.Client.from_service_account_json(os.environ["GOOGLE_APPLICATION_CREDENTIALS"])
+
+
 def ensure_chroma_local(bucket_name: str, prefix: str, collection_dir: str, local_path: str):
     """Ensure Chroma data exists locally. Download from GCS if missing."""
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.environ.get("BUCKET_CREDENTIALS")
@@ -14,19 +27,46 @@ def ensure_chroma_local(bucket_name: str, prefix: str, collection_dir: str, loca
         return
 
     logger.info(f"Downloading Chroma database from GCS bucket={bucket_name}, prefix={prefix}")
-    client = storage.Client.from_service_account_json(os.environ["GOOGLE_APPLICATION_CREDENTIALS"])
+    client = _get_storage_client()
     bucket = client.bucket(bucket_name)
 
     os.makedirs(local_path, exist_ok=True)
 
-    def download_blob(blob):
+    # Collect the sqlite3 file and collection subdirectory, splitting by size
+    large_blobs, small_pairs = [], []
+    for blob in bucket.list_blobs(prefix=prefix):
+        if not (blob.name.endswith("chroma.sqlite3") or blob.name.startswith(f"{prefix}/{collection_dir}")):
+            continue
         rel_path = os.path.relpath(blob.name, prefix)
         dest_path = os.path.join(local_path, rel_path)
         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        blob.download_to_filename(dest_path)
+        if (blob.size or 0) > LARGE_BLOB_BYTES:
+            large_blobs.append((blob, dest_path))
+        else:
+            small_pairs.append((blob, dest_path))
+
+    # chroma.sqlite3 is typically hundreds of MB; parallel ranged GETs beat
+    # one bandwidth-limited stream.
+    for blob, dest_path in large_blobs:
+        transfer_manager.download_chunks_concurrently(
+            blob,
+            dest_path,
+            chunk_size=DOWNLOAD_CHUNK_BYTES,
+            max_workers=8,
+        )
         logger.info(f"Downloaded {blob.name} → {dest_path}")
 
-    # Download the sqlite3 file and collection subdirectory
-    for blob in bucket.list_blobs(prefix=prefix):
-        if blob.name.endswith("chroma.sqlite3") or blob.name.startswith(f"{prefix}/{collection_dir}"):
-            download_blob(blob)
+    # The collection subdir is many small shards; download them concurrently
+    # instead of one serial GET each. raw_download skips gzip transcoding.
+    if small_pairs:
+        results = transfer_manager.download_many(
+            small_pairs,
+            max_workers=16,
+            worker_type=transfer_manager.THREAD,
+            download_kwargs={"raw_download": True},
+        )
+        for (blob, dest_path), result in zip(small_pairs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to download {blob.name}: {result}")
+            else:
+                logger.info(f"Downloaded {blob.name} → {dest_path}")
@@ -10,11 +10,13 @@ Or set the model endpoint in data/tuning_job_info.json
 """
 
 import argparse
+import asyncio
 import json
 import logging
+
+import orjson
 from pathlib import Path
 from typing import List, Dict
-import time
 
 import vertexai
 from vertexai.generative_models import GenerativeModel
@@ -40,10 +42,10 @@ def load_test_data(test_file: str = "data/fiqa_test.jsonl") -> List[Dict]:
     if not test_path.exists():
         raise FileNotFoundError(f"Test file not found: {test_file}")
 
-    test_data = []
-    with open(test_path, "r") as f:
-        for line in f:
-            test_data.append(json.loads(line))
+    # Binary read + orjson: no text decoding pass and a much faster parser
+    # than json.loads on a line-per-record file.
+    with open(test_path, "rb") as f:
+        test_data = [orjson.loads(line) for line in f]
 
     logger.info(f"Loaded {len(test_data)} test examples from {test_file}")
     return test_data
@@ -108,60 +110,76 @@ def evaluate_model(
     num_to_test = min(num_samples, len(test_data))
     logger.info(f"Evaluating on {num_to_test} test examples...")
 
-    for i, example in enumerate(test_data[:num_to_test]):
+    async def _infer(i: int, example: Dict, semaphore: asyncio.Semaphore):
         question = example.get("question", "").strip()
         ground_truth = example.get("answer", "").strip()
 
         if not question or not ground_truth:
-            continue
-
-        try:
-            # Create properly formatted content for tuned model
-            # Use the same format as training data
-            user_content = Content(
-                role="user",
-                parts=[Part.from_text(question)]
-            )
-            
-            # Generate prediction using generate_content with proper format
-            response = model.generate_content(
-                contents=[user_content],
-                generation_config={
-                    "temperature": 0.2,
-                    "top_p": 0.8,
-                    "top_k": 40,
-                    "max_output_tokens": 1024,
+            return None
+
+        # The semaphore caps in-flight requests, which both rate-limits
+        # the endpoint and replaces the old 1s sleep between samples.
+        async with semaphore:
+            try:
+                # Create properly formatted content for tuned model
+                # Use the same format as training data
+                user_content = Content(
+                    role="user",
+                    parts=[Part.from_text(question)]
+                )
+
+                response = await model.generate_content_async(
+                    contents=[user_content],
+                    generation_config={
+                        "temperature": 0.2,
+                        "top_p": 0.8,
+                        "top_k": 40,
+                        "max_output_tokens": 1024,
+                    }
+                )
+
+                return {
+                    "question": question,
+                    "ground_truth": ground_truth,
+                    "prediction": response.text.strip()
                 }
-            )
-            
-            predicted_answer = response.text.strip()
-
-            results["successful"] += 1
-            results["examples"].append({
-                "question": question,
-                "ground_truth": ground_truth,
-                "prediction": predicted_answer
-            })
-
-            if (i + 1) % 10 == 0:
-                logger.info(f"Processed {i + 1}/{num_to_test} examples")
-
-            # Rate limiting
-            time.sleep(1)
-
-        except Exception as e:
-            logger.warning(f"Failed to generate for example {i}: {e}")
-            results["failed"] += 1
-
-        results["total_tested"] += 1
-
-    # Save results
-    results_path = Path("data/evaluation_results.json")
-    with open(results_path, "w") as f:
-        json.dump(results, f, indent=2)
+            except Exception as e:
+                logger.warning(f"Failed to generate for example {i}: {e}")
+                return e
+
+    # Each prediction is appended to the JSONL as soon as it completes, so
+    # a crash mid-run loses nothing already evaluated.
+    results_path = Path("data/evaluation_results.jsonl")
+
+    async def _run_all():
+        semaphore = asyncio.Semaphore(16)
+        tasks = [
+            asyncio.ensure_future(_infer(i, example, semaphore))
+            for i, example in enumerate(test_data[:num_to_test])
+        ]
+        with open(results_path, "ab") as f:
+            for future in asyncio.as_completed(tasks):
+                outcome = await future
+                if outcome is None:
+                    continue
+                if isinstance(outcome, Exception):
+                    results["failed"] += 1
+                else:
+                    results["successful"] += 1
+                    results["examples"].append(outcome)
+                    f.write(orjson.dumps(outcome) + b"\n")
+                    f.flush()
+                results["total_tested"] += 1
+
+    asyncio.run(_run_all())
+
+    # Summary holds counts only; the per-sample records are in the JSONL
+    summary_path = Path("data/evaluation_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump({k: results[k] for k in ("total_tested", "successful", "failed")}, f, indent=2)
 
     logger.info(f"\nEvaluation complete!")
-    logger.info(f"Results saved to: {results_path}")
+    logger.info(f"Results saved to: {results_path} (summary: {summary_path})")
     logger.info(f"Successfully evaluated: {results['successful']}/{results['total_tested']}")
     logger.info(f"Failed: {results['failed']}/{results['total_tested']}")
 
@@ -179,6 +197,113 @@ def evaluate_model(
     return results
 
 
+def evaluate_model_batch(
+    model_endpoint: str,
+    test_data: List[Dict],
+    project_id: str,
+    location: str = "us-central1",
+    num_samples: int = 50,
+    staging_bucket: str = "finwhiz-storage"
+) -> Dict:
+    """
+    Evaluate via a Vertex batch prediction job instead of per-request calls.
+
+    All instances are written to one JSONL in GCS and executed with
+    server-side batching, so there is no client-side rate limit and no
+    per-call overhead — better suited to large sample sweeps.
+    """
+    import time
+
+    from google.cloud import aiplatform, storage
+
+    logger.info(f"Initializing Vertex AI for project {project_id}")
+    aiplatform.init(project=project_id, location=location)
+
+    num_to_test = min(num_samples, len(test_data))
+    examples = [
+        ex for ex in test_data[:num_to_test]
+        if ex.get("question", "").strip() and ex.get("answer", "").strip()
+    ]
+
+    # Stage all instances as one JSONL in GCS
+    storage_client = storage.Client(project=project_id)
+    bucket = storage_client.bucket(staging_bucket)
+    input_path = "finetuning/batch-eval/input.jsonl"
+    lines = [
+        orjson.dumps({
+            "request": {
+                "contents": [{"role": "user", "parts": [{"text": ex["question"].strip()}]}],
+                "generationConfig": {
+                    "temperature": 0.2,
+                    "topP": 0.8,
+                    "topK": 40,
+                    "maxOutputTokens": 1024,
+                },
+            }
+        })
+        for ex in examples
+    ]
+    bucket.blob(input_path).upload_from_string(b"\n".join(lines) + b"\n")
+    input_uri = f"gs://{staging_bucket}/{input_path}"
+    output_prefix = f"gs://{staging_bucket}/finetuning/batch-eval/output"
+    logger.info(f"Staged {len(examples)} instances at {input_uri}")
+
+    job = aiplatform.BatchPredictionJob.submit(
+        source_model=model_endpoint,
+        instances_format="jsonl",
+        predictions_format="jsonl",
+        input_dataset=input_uri,
+        output_uri_prefix=output_prefix,
+    )
+    logger.info(f"Submitted batch prediction job: {job.resource_name}")
+
+    while not job.has_ended:
+        time.sleep(30)
+        job.refresh()
+
+    results = {
+        "total_tested": len(examples),
+        "successful": 0,
+        "failed": 0,
+        "examples": []
+    }
+
+    if job.has_failed:
+        logger.error(f"Batch prediction job failed: {job.error}")
+        results["failed"] = len(examples)
+        return results
+
+    ground_truth = {ex["question"].strip(): ex["answer"].strip() for ex in examples}
+    for blob in job.iter_outputs():
+        for line in blob.download_as_bytes().splitlines():
+            if not line:
+                continue
+            record = orjson.loads(line)
+            try:
+                question = record["request"]["contents"][0]["parts"][0]["text"]
+                prediction = record["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            except (KeyError, IndexError):
+                results["failed"] += 1
+                continue
+            results["successful"] += 1
+            results["examples"].append({
+                "question": question,
+                "ground_truth": ground_truth.get(question, ""),
+                "prediction": prediction.strip()
+            })
+
+    results_path = Path("data/evaluation_results.json")
+    with open(results_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f"\nBatch evaluation complete!")
+    logger.info(f"Results saved to: {results_path}")
+    logger.info(f"Successfully evaluated: {results['successful']}/{results['total_tested']}")
+    logger.info(f"Failed: {results['failed']}/{results['total_tested']}")
+
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(description="Evaluate tuned Gemini model")
     parser.add_argument(
@@ -197,6 +322,11 @@ def main():
         type=str,
         help="GCP project ID (defaults to GCP_PROJECT_ID env var)"
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run evaluation as a Vertex batch prediction job instead of per-request calls"
+    )
 
     args = parser.parse_args()
 
@@ -211,7 +341,8 @@ def main():
     test_data = load_test_data()
 
     # Run evaluation
-    results = evaluate_model(
+    evaluate = evaluate_model_batch if args.batch else evaluate_model
+    results = evaluate(
         model_endpoint=model_endpoint,
         test_data=test_data,
         project_id=project_id,
@@ -16,13 +16,17 @@ Environment Variables Required:
     - GOOGLE_APPLICATION_CREDENTIALS: Path to service account key JSON
 """
 
+import functools
 import json
 import logging
 import os
 from pathlib import Path
 from typing import Any, Dict
 
-from datasets import load_dataset
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+from datasets import Dataset, load_dataset
 from google.cloud import aiplatform, storage
 
 logging.basicConfig(
@@ -32,6 +36,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=1)
+def _storage_client() -> storage.Client:
+    """One storage client per process — auth and connection pool are reused."""
+    return storage.Client()
+
+
 def download_fiqa_dataset(output_dir: str = "data") -> Dict[str, Any]:
     """
     Download FIQA dataset from HuggingFace and save locally.
@@ -46,19 +56,23 @@ def download_fiqa_dataset(output_dir: str = "data") -> Dict[str, Any]:
 
     dataset = load_dataset("LLukas22/fiqa")
 
+    # Only question/answer are ever read; dropping the other columns
+    # shrinks the Arrow footprint, the per-row dicts, and the raw dumps.
+    dataset = {
+        split: data.select_columns(["question", "answer"])
+        for split, data in dataset.items()
+    }
+
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
     train_path = output_path / "fiqa_train.jsonl"
     test_path = output_path / "fiqa_test.jsonl"
 
-    with open(train_path, "w") as f:
-        for item in dataset["train"]:
-            f.write(json.dumps(item) + "\n")
-
-    with open(test_path, "w") as f:
-        for item in dataset["test"]:
-            f.write(json.dumps(item) + "\n")
+    # Arrow-native JSONL export across all cores — no per-row Python
+    # dict + json.dumps loop for the raw dumps.
+    dataset["train"].to_json(str(train_path), lines=True, orient="records", num_proc=os.cpu_count())
+    dataset["test"].to_json(str(test_path), lines=True, orient="records", num_proc=os.cpu_count())
 
     logger.info(f"Saved train set to {train_path} ({len(dataset['train'])} examples)")
     logger.info(f"Saved test set to {test_path} ({len(dataset['test'])} examples)")
@@ -66,6 +80,35 @@ def download_fiqa_dataset(output_dir: str = "data") -> Dict[str, Any]:
     return dataset
 
 
+def _trimmed_qa(ds: Dataset) -> Dataset:
+    """Trim and drop empty QA pairs in vectorized Arrow compute.
+
+    Runs over the columnar buffers in C instead of one Python
+    .strip()/truthiness check per row.
+    """
+    tbl = ds.data.table
+    question = pc.utf8_trim_whitespace(tbl.column("question"))
+    answer = pc.utf8_trim_whitespace(tbl.column("answer"))
+    mask = pc.and_(
+        pc.greater(pc.utf8_length(question), 0),
+        pc.greater(pc.utf8_length(answer), 0),
+    )
+    return Dataset(pa.table({"question": question, "answer": answer}).filter(mask))
+
+
+def _format_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
+    """Reshape a batch of already-trimmed FIQA rows into Gemini records."""
+    return {
+        "contents": [
+            [
+                {"role": "user", "parts": [{"text": question}]},
+                {"role": "model", "parts": [{"text": answer}]},
+            ]
+            for question, answer in zip(batch["question"], batch["answer"])
+        ]
+    }
+
+
 def prepare_gemini_format(
     dataset: Dict[str, Any],
     output_file: str = "data/gemini_train_100.jsonl",
@@ -101,37 +144,22 @@ def prepare_gemini_format(
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    examples_written = 0
-
-    with open(output_path, "w") as f:
-        for item in dataset["train"]:
-            if examples_written >= num_examples:
-                break
-
-            question = item.get("question", "").strip()
-            answer = item.get("answer", "").strip()
-
-            if not question or not answer:
-                continue
-
-            # Google's GenerateContent format
-            gemini_format = {
-                "contents": [
-                    {
-                        "role": "user",
-                        "parts": [{"text": question}]
-                    },
-                    {
-                        "role": "model",
-                        "parts": [{"text": answer}]
-                    }
-                ]
-            }
-
-            f.write(json.dumps(gemini_format) + "\n")
-            examples_written += 1
-
-    logger.info(f"Saved {examples_written} formatted examples to {output_path}")
+    # Per-record reshaping is stateless, so fan the batches out across
+    # cores with Dataset.map and let to_json do the Arrow-native dump.
+    # Trimming/filtering happens first, vectorized over the Arrow table.
+    train = _trimmed_qa(dataset["train"])
+    formatted = train.map(
+        _format_batch,
+        batched=True,
+        batch_size=1024,
+        num_proc=os.cpu_count(),
+        remove_columns=train.column_names,
+    )
+    if num_examples:
+        formatted = formatted.select(range(min(num_examples, len(formatted))))
+    formatted.to_json(str(output_path), lines=True, orient="records")
+
+    logger.info(f"Saved {len(formatted)} formatted examples to {output_path}")
     return output_path
 
 
@@ -153,9 +181,11 @@ def upload_to_gcs(
     """
     logger.info(f"Uploading {local_file} to gs://{bucket_name}/{blob_name}")
 
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
+    bucket = _storage_client().bucket(bucket_name)
     blob = bucket.blob(blob_name)
+    # 16 MiB resumable chunks instead of the tiny default — fewer
+    # round trips per file
+    blob.chunk_size = 16 * 1024 * 1024
 
     blob.upload_from_filename(str(local_file))
 
@@ -12,14 +12,22 @@ Environment Variables Required:
     - GOOGLE_APPLICATION_CREDENTIALS: Path to service account key JSON
 """
 
+import asyncio
+import functools
+import gzip
+import hashlib
 import json
 import logging
 import os
+import queue
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List
 
+import orjson
 from datasets import load_dataset
 from google.cloud import aiplatform, storage
+from google.cloud.storage import transfer_manager
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,51 +35,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Roll formatted output into a new shard past this many (uncompressed)
+# bytes; ~128 MiB shards let Vertex ingest them in parallel and keep any
+# single upload stream short.
+SHARD_BYTES = 128 * 1024 * 1024
+
+# Accumulate this many records in a bytearray before handing them to the
+# file object — one write call per batch instead of two per record.
+FLUSH_EVERY = 1000
+
+DATASET_NAME = "LLukas22/fiqa"
+
+# Written next to the raw dumps once a download completes; a matching
+# manifest on the next run means the local JSONL can be replayed instead
+# of re-streaming from the hub.
+_MANIFEST = {"dataset": DATASET_NAME, "format": "v1"}
+
+
+class _JsonlSplit:
+    """Replays records from a previously written raw JSONL dump."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield orjson.loads(line)
+
+
+def _shard_path(base: Path, index: int) -> Path:
+    """data/gemini_train_full.jsonl.gz -> data/gemini_train_full.part-0000.jsonl.gz"""
+    name = base.name
+    for suffix in (".jsonl.gz", ".jsonl"):
+        if name.endswith(suffix):
+            return base.with_name(f"{name[:-len(suffix)]}.part-{index:04d}{suffix}")
+    return base.with_name(f"{base.stem}.part-{index:04d}{base.suffix}")
+
+
+def _open_gemini_file(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "wb", compresslevel=1)
+    return open(path, "wb", buffering=4 << 20)
+
+
+@functools.lru_cache(maxsize=1)
+def _storage_client() -> storage.Client:
+    """One storage client per process — auth and connection pool are reused."""
+    return storage.Client()
+
 
 def download_fiqa_dataset(output_dir: str = "data") -> Dict[str, Any]:
     """
-    Download FIQA dataset from HuggingFace and save locally.
+    Open the FIQA dataset from HuggingFace as streams.
+
+    The splits come back as IterableDatasets, so records flow through a
+    single pass in prepare_gemini_format instead of materializing the full
+    Arrow tables in memory and then iterating them again.
+
+    If a previous run already wrote the raw dumps (and the manifest
+    records the same dataset), the local JSONL is replayed instead of
+    hitting the hub again — warm re-runs skip the network entirely.
 
     Args:
-        output_dir: Directory to save the dataset
+        output_dir: Directory the JSONL outputs will be written to
 
     Returns:
-        Dictionary containing train and test datasets
+        Dictionary containing train and test dataset streams
     """
-    logger.info("Downloading FIQA dataset from HuggingFace")
-
-    dataset = load_dataset("LLukas22/fiqa")
-
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
     train_path = output_path / "fiqa_train.jsonl"
     test_path = output_path / "fiqa_test.jsonl"
+    manifest_path = output_path / "fiqa.manifest.json"
 
-    with open(train_path, "w") as f:
-        for item in dataset["train"]:
-            f.write(json.dumps(item) + "\n")
+    if train_path.exists() and test_path.exists() and manifest_path.exists():
+        try:
+            if json.loads(manifest_path.read_text()) == _MANIFEST:
+                logger.info("Local FIQA dump is current; replaying it instead of downloading")
+                return {"train": _JsonlSplit(train_path), "test": _JsonlSplit(test_path)}
+        except ValueError:
+            pass
 
-    with open(test_path, "w") as f:
-        for item in dataset["test"]:
-            f.write(json.dumps(item) + "\n")
+    logger.info("Streaming FIQA dataset from HuggingFace")
 
-    logger.info(f"Saved train set to {train_path} ({len(dataset['train'])} examples)")
-    logger.info(f"Saved test set to {test_path} ({len(dataset['test'])} examples)")
+    dataset = load_dataset(DATASET_NAME, streaming=True)
 
-    return dataset
+    # Only question/answer are ever read; projecting here means each
+    # record materializes a two-key dict instead of the full FIQA row.
+    return {
+        split: data.select_columns(["question", "answer"])
+        for split, data in dataset.items()
+    }
 
 
-def prepare_gemini_format(
-    dataset: Dict[str, Any],
-    split: str = "train",
-    output_file: str = "data/gemini_train_full.jsonl",
-    num_examples: int = None
-) -> Path:
+def write_split(
+    data_split: Any,
+    raw_file: str,
+    output_file: str,
+    num_examples: int = None,
+    on_shard: Callable[[Path], None] = None
+) -> List[Path]:
     """
-    Convert FIQA dataset to Gemini finetuning format.
+    Write one split's raw and Gemini-format JSONL in a single pass.
+
+    The formatted output is split into ~128 MiB shards
+    (<name>.part-000N.<ext>) so shard uploads can run in parallel and the
+    ingest side reads balanced blocks.
 
-    Gemini expects JSONL with Google's GenerateContent format:
+    Each record is written both verbatim to raw_file (the local dataset
+    copy) and reshaped into Google's GenerateContent format:
     {
         "contents": [
             {
@@ -86,55 +160,144 @@ def prepare_gemini_format(
     }
 
     Args:
-        dataset: HuggingFace dataset object
-        split: Which split to use ("train" or "test")
+        data_split: Iterable of FIQA records (a streaming split)
+        raw_file: Path to save the unmodified records
         output_file: Path to save formatted data
         num_examples: Number of examples to include (None = all)
+        on_shard: Called with each shard Path as soon as it is finalized,
+            so consumers (e.g. uploads) can overlap with formatting
 
     Returns:
-        Path object pointing to the output file
+        List of shard Paths holding the formatted output
     """
-    data_split = dataset[split]
-    total_examples = len(data_split)
-    num_to_process = num_examples if num_examples else total_examples
-    
-    logger.info(f"Converting {num_to_process} {split} examples to Gemini GenerateContent format")
-
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    raw_path = Path(raw_file)
+
+    # Incremental skip: if a previous run wrote these shards from the same
+    # inputs (recorded as a key in the sidecar), the format pass is free.
+    meta_path = output_path.with_name(output_path.name + ".meta.json")
+    key = hashlib.sha256(
+        f"{DATASET_NAME}|{raw_file}|{num_examples}|v1-format".encode()
+    ).hexdigest()
+    if meta_path.exists() and raw_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+            shards = [Path(p) for p in meta.get("shards", [])]
+            if meta.get("key") == key and shards and all(p.exists() for p in shards):
+                logger.info(f"{output_path.name} is up to date; skipping format pass")
+                if on_shard:
+                    for shard in shards:
+                        on_shard(shard)
+                return shards
+        except ValueError:
+            pass
+
+    logger.info(f"Converting examples to Gemini GenerateContent format")
 
     examples_written = 0
-
-    with open(output_path, "w") as f:
-        for item in data_split:
-            if num_examples and examples_written >= num_examples:
-                break
-
-            question = item.get("question", "").strip()
-            answer = item.get("answer", "").strip()
-
-            if not question or not answer:
-                continue
-
-            # Google's GenerateContent format
-            gemini_format = {
-                "contents": [
-                    {
-                        "role": "user",
-                        "parts": [{"text": question}]
-                    },
-                    {
-                        "role": "model",
-                        "parts": [{"text": answer}]
-                    }
-                ]
-            }
-
-            f.write(json.dumps(gemini_format) + "\n")
-            examples_written += 1
-
-    logger.info(f"Saved {examples_written} formatted examples to {output_path}")
-    return output_path
+    duplicates_skipped = 0
+    seen: set = set()
+    shard_paths = [_shard_path(output_path, 0)]
+    shard_bytes = 0
+
+    # orjson's C encoder plus explicit record batching: lines accumulate
+    # in bytearrays and reach the file objects as one write per
+    # FLUSH_EVERY records, instead of two tiny writes per record.
+    # The raw dump shares the same pass, so the stream is consumed once.
+    # Gemini-format JSONL is highly repetitive, so a .gz output path gets
+    # stream-compressed at level 1 — 5-10x fewer bytes to upload for
+    # negligible encoder CPU, and Vertex ingests gzipped JSONL directly.
+    raw_chunk = bytearray()
+    gemini_chunk = bytearray()
+    pending = 0
+    # Replayed splits iterate the raw dump itself — don't truncate it
+    rewrite_raw = not (isinstance(data_split, _JsonlSplit) and data_split.path == raw_path)
+    raw_f = open(raw_path, "wb", buffering=4 << 20) if rewrite_raw else None
+    try:
+        f = _open_gemini_file(shard_paths[-1])
+        try:
+            for item in data_split:
+                if num_examples and examples_written >= num_examples:
+                    break
+
+                if rewrite_raw:
+                    raw_chunk += orjson.dumps(item)
+                    raw_chunk += b"\n"
+
+                question = item.get("question", "").strip()
+                answer = item.get("answer", "").strip()
+
+                if not question or not answer:
+                    continue
+
+                # Vertex charges per training token, so exact duplicate
+                # pairs are pure cost; one int hash per pair filters them.
+                pair_hash = hash((question, answer))
+                if pair_hash in seen:
+                    duplicates_skipped += 1
+                    continue
+                seen.add(pair_hash)
+
+                # Google's GenerateContent format
+                gemini_format = {
+                    "contents": [
+                        {
+                            "role": "user",
+                            "parts": [{"text": question}]
+                        },
+                        {
+                            "role": "model",
+                            "parts": [{"text": answer}]
+                        }
+                    ]
+                }
+
+                if shard_bytes >= SHARD_BYTES:
+                    f.write(gemini_chunk)
+                    gemini_chunk.clear()
+                    f.close()
+                    if on_shard:
+                        on_shard(shard_paths[-1])
+                    shard_paths.append(_shard_path(output_path, len(shard_paths)))
+                    f = _open_gemini_file(shard_paths[-1])
+                    shard_bytes = 0
+                line = orjson.dumps(gemini_format)
+                gemini_chunk += line
+                gemini_chunk += b"\n"
+                shard_bytes += len(line) + 1
+                examples_written += 1
+
+                pending += 1
+                if pending >= FLUSH_EVERY:
+                    if raw_f is not None:
+                        raw_f.write(raw_chunk)
+                        raw_chunk.clear()
+                    f.write(gemini_chunk)
+                    gemini_chunk.clear()
+                    pending = 0
+        finally:
+            if raw_f is not None and raw_chunk:
+                raw_f.write(raw_chunk)
+            if gemini_chunk:
+                f.write(gemini_chunk)
+            f.close()
+    finally:
+        if raw_f is not None:
+            raw_f.close()
+
+    if on_shard:
+        on_shard(shard_paths[-1])
+
+    logger.info(f"Saved raw records to {raw_path}")
+    if duplicates_skipped:
+        logger.info(f"Skipped {duplicates_skipped} duplicate (question, answer) pairs")
+    logger.info(
+        f"Saved {examples_written} formatted examples to "
+        f"{len(shard_paths)} shard(s) of {output_path.name}"
+    )
+    meta_path.write_text(json.dumps({"key": key, "shards": [str(p) for p in shard_paths]}))
+    return shard_paths
 
 
 def upload_to_gcs(
@@ -155,11 +318,27 @@ def upload_to_gcs(
     """
     logger.info(f"Uploading {local_file} to gs://{bucket_name}/{blob_name}")
 
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
+    bucket = _storage_client().bucket(bucket_name)
     blob = bucket.blob(blob_name)
-
-    blob.upload_from_filename(str(local_file))
+    # 16 MiB resumable chunks instead of the tiny default — fewer
+    # round trips per shard
+    blob.chunk_size = 16 * 1024 * 1024
+
+    if local_file.suffix == ".gz":
+        # Tell GCS the payload is gzip so consumers can transcode on read
+        blob.content_encoding = "gzip"
+
+    if local_file.stat().st_size > 32 * 1024 * 1024:
+        # A single resumable stream is bandwidth-limited; sliced parallel
+        # uploads roughly double throughput for large training files.
+        transfer_manager.upload_chunks_concurrently(
+            str(local_file),
+            blob,
+            chunk_size=32 * 1024 * 1024,
+            max_workers=8,
+        )
+    else:
+        blob.upload_from_filename(str(local_file))
 
     gcs_uri = f"gs://{bucket_name}/{blob_name}"
     logger.info(f"Upload complete: {gcs_uri}")
@@ -167,7 +346,21 @@ def upload_to_gcs(
     return gcs_uri
 
 
-def run_gemini_tuning(
+@functools.lru_cache(maxsize=4)
+def _get_tuning_client(location: str):
+    """One async tuning client per region — reused across submissions.
+
+    Client construction pays auth and TLS setup; caching it means sweeps
+    submitting several jobs (adapter sizes, epochs) don't serialize on it.
+    """
+    from google.cloud.aiplatform_v1 import GenAiTuningServiceAsyncClient
+
+    return GenAiTuningServiceAsyncClient(
+        client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+    )
+
+
+async def run_gemini_tuning(
     project_id: str,
     location: str,
     training_data_uri: str,
@@ -179,6 +372,8 @@ def run_gemini_tuning(
     """
     Submit a Gemini 2.5 Flash Lite finetuning job to Vertex AI using Python SDK.
 
+    Submission is async so concurrent submissions don't block each other.
+
     Args:
         project_id: GCP project ID
         location: GCP region (e.g., 'us-central1')
@@ -204,15 +399,12 @@ def run_gemini_tuning(
     logger.info(f"Adapter size: {adapter_size}")
 
     try:
-        from google.cloud.aiplatform_v1 import GenAiTuningServiceClient
         from google.cloud.aiplatform_v1.types import (
             TuningJob,
             SupervisedTuningSpec,
         )
 
-        client = GenAiTuningServiceClient(
-            client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
-        )
+        client = _get_tuning_client(location)
 
         parent = f"projects/{project_id}/locations/{location}"
 
@@ -242,25 +434,24 @@ def run_gemini_tuning(
         logger.info(f"  - Adapter size: {adapter_size}")
         logger.info(f"  - Learning rate multiplier: 1.0")
         
-        response = client.create_tuning_job(parent=parent, tuning_job=tuning_job)
+        response = await client.create_tuning_job(parent=parent, tuning_job=tuning_job)
 
         logger.info(f"Tuning job submitted: {response.name}")
         logger.info("Job is running. Monitor progress in the Vertex AI console.")
 
         # Save the job name for later reference
         job_info_path = Path("data/tuning_job_info.json")
-        with open(job_info_path, "w") as f:
-            json.dump({
-                "job_name": response.name,
-                "model_display_name": model_display_name,
-                "base_model": "gemini-2.5-flash-lite",
-                "training_data_uri": training_data_uri,
-                "validation_data_uri": validation_data_uri,
-                "epochs": epochs,
-                "adapter_size": adapter_size,
-                "hyper_parameters": hyper_params,
-                "timestamp": str(response.create_time) if hasattr(response, 'create_time') else None
-            }, f, indent=2)
+        job_info_path.write_bytes(orjson.dumps({
+            "job_name": response.name,
+            "model_display_name": model_display_name,
+            "base_model": "gemini-2.5-flash-lite",
+            "training_data_uri": training_data_uri,
+            "validation_data_uri": validation_data_uri,
+            "epochs": epochs,
+            "adapter_size": adapter_size,
+            "hyper_parameters": hyper_params,
+            "timestamp": str(response.create_time) if hasattr(response, 'create_time') else None
+        }, option=orjson.OPT_INDENT_2))
         logger.info(f"Job info saved to {job_info_path}")
 
         return response.name
@@ -318,51 +509,73 @@ def main():
     logger.info(f"Bucket: {bucket_name}")
     logger.info(f"Region: {location}")
 
-    # Step 1: Download FIQA dataset
+    # Step 1: Open FIQA dataset streams
     dataset = download_fiqa_dataset()
 
-    # Step 2: Prepare ALL training examples in Gemini format
-    formatted_file = prepare_gemini_format(
-        dataset, 
-        split="train",
-        output_file="data/gemini_train_full.jsonl",
-        num_examples=None
+    # Steps 2-5: format and upload overlapped. Each shard is queued for
+    # upload the moment write_split finalizes it, so the network transfer
+    # runs while the CPU keeps serializing the next shard — wall time is
+    # max(serialize, upload) instead of their sum.
+    upload_queue: queue.Queue = queue.Queue(maxsize=2)
+    upload_errors: list = []
+
+    def _uploader():
+        while True:
+            shard = upload_queue.get()
+            if shard is None:
+                break
+            try:
+                upload_to_gcs(shard, bucket_name, f"finetuning/{shard.name}")
+            except Exception as e:
+                upload_errors.append((shard, e))
+            finally:
+                upload_queue.task_done()
+
+    uploader = threading.Thread(target=_uploader, daemon=True)
+    uploader.start()
+
+    train_shards = write_split(
+        dataset["train"],
+        raw_file="data/fiqa_train.jsonl",
+        output_file="data/gemini_train_full.jsonl.gz",
+        num_examples=None,
+        on_shard=upload_queue.put
     )
 
-    # Step 3: Prepare validation set
-    validation_formatted_file = prepare_gemini_format(
-        dataset,
-        split="test",
-        output_file="data/gemini_validation.jsonl",
-        num_examples=None
+    validation_shards = write_split(
+        dataset["test"],
+        raw_file="data/fiqa_test.jsonl",
+        output_file="data/gemini_validation.jsonl.gz",
+        num_examples=None,
+        on_shard=upload_queue.put
     )
-    logger.info(f"Validation set prepared: {validation_formatted_file}")
+    logger.info(f"Validation set prepared: {len(validation_shards)} shard(s)")
 
-    # Step 4: Upload training data to GCS
-    train_gcs_uri = upload_to_gcs(
-        formatted_file, 
-        bucket_name,
-        "finetuning/gemini_train_full.jsonl"
-    )
+    # Both raw dumps are complete: record the manifest so the next run
+    # replays them instead of re-downloading
+    (Path("data") / "fiqa.manifest.json").write_text(json.dumps(_MANIFEST))
 
-    # Step 5: Upload validation data to GCS
-    validation_gcs_uri = upload_to_gcs(
-        validation_formatted_file,
-        bucket_name,
-        "finetuning/gemini_validation.jsonl"
-    )
+    upload_queue.put(None)
+    uploader.join()
+    if upload_errors:
+        shard, error = upload_errors[0]
+        raise RuntimeError(f"Failed to upload {shard}: {error}")
+
+    # Vertex accepts wildcard URIs, so the job reads every shard
+    train_gcs_uri = f"gs://{bucket_name}/finetuning/gemini_train_full.part-*.jsonl.gz"
+    validation_gcs_uri = f"gs://{bucket_name}/finetuning/gemini_validation.part-*.jsonl.gz"
     logger.info(f"Validation data uploaded: {validation_gcs_uri}")
 
     # Step 6: Run full finetuning job with 3 epochs
-    job_name = run_gemini_tuning(
-        project_id, 
-        location, 
+    job_name = asyncio.run(run_gemini_tuning(
+        project_id,
+        location,
         train_gcs_uri,
         validation_gcs_uri,
         model_display_name="gemini-flash-lite-fiqa-full",
         epochs=3,
         adapter_size="ADAPTER_SIZE_FOUR"
-    )
+    ))
 
     # Step 7: Show billing instructions
     check_billing_cost(project_id)
@@ -372,8 +585,8 @@ def main():
     logger.info("="*70)
     logger.info(f"Job name: {job_name}")
     logger.info(f"Model: Gemini 2.5 Flash Lite")
-    logger.info(f"Training examples: {len(dataset['train'])}")
-    logger.info(f"Validation examples: {len(dataset['test'])}")
+    logger.info(f"Training data: {train_gcs_uri}")
+    logger.info(f"Validation data: {validation_gcs_uri}")
     logger.info(f"Epochs: 3")
     logger.info(f"Adapter size: ADAPTER_SIZE_FOUR")
     logger.info("\nNext steps:")
@@ -1,12 +1,14 @@
+import asyncio
 import os
 import logging
-import requests
+import httpx
+import math
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from rank_bm25 import BM25Okapi
+from collections import Counter
 import re
 from typing import Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer
@@ -42,12 +44,32 @@ logger.info("Initializing ChromaDB client")
 client = PersistentClient(path=CHROMA_PATH)
 collection = client.get_or_create_collection(COLLECTION_NAME)
 
-logger.info("Loading embedding model")
-embedder = SentenceTransformer("jinaai/jina-embeddings-v3", device="cpu", trust_remote_code=True)
+#Optional ONNX Runtime backend for query embedding: the exported graph
+#skips eager PyTorch dispatch and runs fused/quantized kernels, which is
+#several times faster for single-query CPU encodes. Opt-in via env var
+#since it needs the onnxruntime/optimum extras installed.
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "torch")
+
+logger.info(f"Loading embedding model (backend={EMBEDDER_BACKEND})")
+try:
+    embedder = SentenceTransformer(
+        "jinaai/jina-embeddings-v3",
+        device="cpu",
+        trust_remote_code=True,
+        backend=EMBEDDER_BACKEND,
+    )
+except Exception as e:
+    if EMBEDDER_BACKEND == "torch":
+        raise
+    logger.warning(f"{EMBEDDER_BACKEND} backend unavailable ({e}); falling back to torch")
+    embedder = SentenceTransformer("jinaai/jina-embeddings-v3", device="cpu", trust_remote_code=True)
 
 logger.info("Initializing Vertex AI model")
 llm = VertexAI(model_name="gemini-2.5-pro")
 
+#shared async HTTP client for agent calls — one pooled connection set for
+#the process instead of a new session per request
+http_client = httpx.AsyncClient(timeout=30)
 
 app = FastAPI(title="FinWhiz LLM Service")
 
@@ -58,16 +80,128 @@ class QueryRequest(BaseModel):
     top_k: int = 5
 
 
-def reciprocal_rank_fusion(rank_lists, k=60):
-    """Combine multiple ranked lists via RRF."""
-    fused_scores = {}
-    for rank_list in rank_lists:
-        for rank, doc_id in enumerate(rank_list):
-            fused_scores[doc_id] = fused_scores.get(doc_id, 0) + 1.0/(k+rank+1)
-    return sorted(fused_scores.items(), key=lambda x:x[1], reverse=True)
+def reciprocal_rank_fusion(index_lists, num_docs, k=60):
+    """Combine ranked corpus-index arrays via RRF, vectorized.
+
+    Rankings over the same corpus fuse into one dense score array indexed
+    by corpus position — no per-entry dict updates or string doc-id keys.
+    Returns the fused scores; pick winners with _top_indices.
+    """
+    fused = np.zeros(num_docs, dtype=np.float32)
+    for indices in index_lists:
+        fused[indices] += 1.0 / (k + np.arange(len(indices), dtype=np.float32) + 1.0)
+    return fused
+
+_TOKEN_RE = re.compile(r"\w+")
 
 def tokenize(text):
-    return re.findall(r"\w+", text.lower())
+    return _TOKEN_RE.findall(text.lower())
+
+
+class _Bm25Index:
+    """CSR inverted index with BM25 term weights precomputed per posting.
+
+    BM25Okapi recomputes IDF and length normalization for every posting on
+    every query. Here each posting's full contribution is fixed once at
+    build time, so scoring a query is just a gather-add over the postings
+    of its terms instead of touching the whole corpus.
+    """
+
+    def __init__(self, tokenized_corpus, k1=1.5, b=0.75):
+        self.num_docs = len(tokenized_corpus)
+        doc_lens = np.array([len(tokens) for tokens in tokenized_corpus], dtype=np.float32)
+        avg_len = float(doc_lens.mean()) if self.num_docs else 1.0
+
+        postings: dict = {}
+        for doc_idx, tokens in enumerate(tokenized_corpus):
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_idx)
+                postings[term][1].append(tf)
+
+        self.vocab = {}
+        indptr = [0]
+        doc_idx_parts = []
+        weight_parts = []
+        for term, (doc_idx_list, tf_list) in postings.items():
+            self.vocab[term] = len(self.vocab)
+            df = len(doc_idx_list)
+            idf = math.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            tf = np.array(tf_list, dtype=np.float32)
+            lens = doc_lens[doc_idx_list]
+            denom = tf + k1 * (1.0 - b + b * lens / avg_len)
+            weight_parts.append(idf * (k1 + 1.0) * tf / denom)
+            doc_idx_parts.append(np.array(doc_idx_list, dtype=np.int32))
+            indptr.append(indptr[-1] + df)
+
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.doc_indices = (
+            np.concatenate(doc_idx_parts) if doc_idx_parts else np.empty(0, dtype=np.int32)
+        )
+        self.weights = (
+            np.concatenate(weight_parts) if weight_parts else np.empty(0, dtype=np.float32)
+        )
+
+    def get_scores(self, query_tokens):
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in query_tokens:
+            term_idx = self.vocab.get(term)
+            if term_idx is None:
+                continue
+            start, end = self.indptr[term_idx], self.indptr[term_idx + 1]
+            np.add.at(scores, self.doc_indices[start:end], self.weights[start:end])
+        return scores
+
+
+#RRF corpus cache: tokenizing every document and rebuilding the BM25 index
+#on each query dominates retrieval latency, but the corpus only changes when
+#documents are added. Key on collection.count() so the cache invalidates
+#when the collection grows.
+_BM25_CACHE: dict = {}
+
+def _get_corpus_index():
+    """Return (docs, doc_ids, doc_embs, emb_scales, tokenized_corpus, bm25).
+
+    Built once per corpus version. Embedding rows are L2-normalized, then
+    quantized to int8 with a per-row scale (abs-max / 127), quartering the
+    resident matrix vs float32. Cosine similarity against a normalized query
+    is (doc_embs @ q) * emb_scales — the dequantization folds into one
+    per-row multiply and ranking is unaffected by the ~0.5% quantization
+    error.
+    """
+    corpus_version = collection.count()
+    cached = _BM25_CACHE.get(corpus_version)
+    if cached is not None:
+        return cached
+
+    chroma_data = collection.get(include=['embeddings', 'documents', 'metadatas'])
+    docs = chroma_data.get('documents') or []
+    doc_ids = np.array(chroma_data['ids'])
+    doc_embs = np.ascontiguousarray(chroma_data['embeddings'], dtype=np.float32)
+    norms = np.linalg.norm(doc_embs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    doc_embs /= norms
+
+    emb_scales = np.abs(doc_embs).max(axis=1) / 127.0
+    emb_scales[emb_scales == 0] = 1.0
+    doc_embs = np.round(doc_embs / emb_scales[:, None]).astype(np.int8)
+
+    tokenized_corpus = [tokenize(d) for d in docs]
+    bm25 = _Bm25Index(tokenized_corpus)
+
+    _BM25_CACHE.clear()
+    _BM25_CACHE[corpus_version] = (docs, doc_ids, doc_embs, emb_scales, tokenized_corpus, bm25)
+    logger.info(f"Built BM25/embedding cache for {len(docs)} documents")
+    return _BM25_CACHE[corpus_version]
+
+def _top_indices(scores, k):
+    """Indices of the k highest scores, highest first.
+
+    argpartition is O(n); only the k survivors are actually sorted.
+    """
+    k = min(k, len(scores))
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(scores[top])[::-1]]
 
 def normalize_chroma_results(results):
     """Normalize Chroma query/get results to a consistent structure."""
@@ -100,32 +234,31 @@ def normalize_chroma_results(results):
 def retrieve_context(query: str, top_k: int = 5, method:str = "rrf") -> tuple[str, list[dict]]:
     """Embed the query and retrieve context documents + metadata from Chroma."""
     query_emb = embedder.encode(query, task="retrieval.query", convert_to_numpy=True)
-    if query_emb.ndim == 1:
-        query_emb = [query_emb.tolist()]
+    if query_emb.ndim > 1:
+        query_emb = query_emb[0]
 
     if method == 'cosine':
-        results = collection.query(query_embeddings=query_emb, n_results=top_k)
+        results = collection.query(query_embeddings=[query_emb.tolist()], n_results=top_k)
     elif method == 'rrf':
         try:
-            chroma_data = collection.get(include=['embeddings', 'documents','metadatas'])
-            if chroma_data:
-                logging.info("Have Chroma Data")
-            docs = chroma_data.get('documents') or []
+            docs, doc_ids, doc_embs, emb_scales, tokenized_corpus, bm25 = _get_corpus_index()
             if not docs:
                 logging.error("No Documents")
-            doc_embs = np.array(chroma_data['embeddings'])
-            doc_ids = np.array(chroma_data['ids'])
 
-            cos_scores = cosine_similarity(query_emb, doc_embs)[0]
-            cosine_rank = [doc_ids[i] for i in np.argsort(cos_scores)[::-1][:top_k * 2]]
+            # Cached rows are L2-normalized and int8-quantized, so cosine
+            # similarity is one mat-vec product plus the per-row dequant scale.
+            q = np.asarray(query_emb, dtype=np.float32)
+            q_norm = np.linalg.norm(q)
+            if q_norm > 0:
+                q = q / q_norm
+            cos_scores = (doc_embs @ q) * emb_scales
+            cosine_rank = _top_indices(cos_scores, top_k * 2)
 
-            tokenized_corpus = [tokenize(d) for d in docs]
-            bm25 = BM25Okapi(tokenized_corpus)
             bm25_scores = bm25.get_scores(tokenize(query))
+            bm25_rank = _top_indices(bm25_scores, top_k * 2)
 
-            bm25_rank = [doc_ids[i] for i in np.argsort(bm25_scores)[::-1][:top_k * 2]]
-            fused = reciprocal_rank_fusion([cosine_rank, bm25_rank])
-            fused_doc_ids = [doc_id for doc_id, _ in fused[:top_k]]
+            fused = reciprocal_rank_fusion([cosine_rank, bm25_rank], len(doc_ids))
+            fused_doc_ids = [doc_ids[i] for i in _top_indices(fused, top_k)]
 
             results = collection.get(ids=fused_doc_ids)
         except Exception as e:
@@ -165,12 +298,12 @@ def retrieve_context(query: str, top_k: int = 5, method:str = "rrf") -> tuple[st
     logger.info(f"Retrieved {len(docs)} documents from Chroma for Query: {query}")
     return context, citations
 
-def retrieve_agent_context(session_id: str | None) -> str:
+async def retrieve_agent_context(session_id: str | None) -> str:
     """Fetch chat and uploaded document context from agent"""
     if not session_id:
         return ""
     try:
-        response = requests.get(f"{AGENT_URL}/sessions/{session_id}/context")
+        response = await http_client.get(f"{AGENT_URL}/sessions/{session_id}/context")
         response.raise_for_status()
         data = response.json()
 
@@ -202,22 +335,25 @@ def retrieve_agent_context(session_id: str | None) -> str:
         logger.warning(f"Failed to fetch agent context: {e}")
         return ""
 
-def generate_answer(prompt: str) -> str:
+async def generate_answer(prompt: str) -> str:
     """Query the VertexAI LLM."""
     try:
-        return llm.invoke(prompt)
+        return await llm.ainvoke(prompt)
     except Exception as e:
         logger.error(f"LLM query failed: {e}")
         return f"Error: {e}"
 
-#API endpoint
-@app.post("/query")
-async def handle_query(req: QueryRequest):
-    # Fetch agentic context (chat messages + W-2 fields)
-    agent_context = retrieve_agent_context(req.session_id)
+async def build_prompt(req: QueryRequest) -> tuple[str, str, list[dict]]:
+    """Gather contexts and assemble the LLM prompt for a query.
 
-    # Fetch Chroma context
-    chroma_context, citations = retrieve_context(req.query, top_k=req.top_k, method='rrf')
+    The agent round-trip and the Chroma retrieval (embedding included,
+    which is CPU-bound and runs in a worker thread) overlap instead of
+    running back to back, and neither blocks the event loop.
+    """
+    agent_context, (chroma_context, citations) = await asyncio.gather(
+        retrieve_agent_context(req.session_id),
+        asyncio.to_thread(retrieve_context, req.query, req.top_k, 'rrf'),
+    )
 
     # Combine contexts
     full_context = ""
@@ -250,9 +386,35 @@ async def handle_query(req: QueryRequest):
         f"User query: {req.query}"
     )
 
-    answer = generate_answer(prompt)
+    return prompt, full_context, citations
+
+#API endpoint
+@app.post("/query")
+async def handle_query(req: QueryRequest):
+    prompt, full_context, citations = await build_prompt(req)
+    answer = await generate_answer(prompt)
     return {"answer": answer, "context": full_context, "sources": citations}
-    
+
+@app.post("/query/stream")
+async def handle_query_stream(req: QueryRequest):
+    """Stream the answer as it is generated.
+
+    Time-to-first-byte drops from the full generation time to first-token
+    latency; the JSON /query endpoint keeps its existing contract for
+    clients that want the complete answer plus sources in one response.
+    """
+    prompt, _, _ = await build_prompt(req)
+
+    async def stream():
+        try:
+            async for chunk in llm.astream(prompt):
+                yield chunk
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            yield f"Error: {e}"
+
+    return StreamingResponse(stream(), media_type="text/plain")
+
 #health check
 @app.get("/health")
 def health_check():
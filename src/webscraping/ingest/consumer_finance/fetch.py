@@ -2,12 +2,15 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Optional
-from urllib.parse import urljoin
+from typing import Iterable, Iterator, Optional, Union
+from urllib.parse import urljoin, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 DEFAULT_HEADERS = {"User-Agent": "FW-Ingest/0.1"}
 LOGGER = logging.getLogger(__name__)
@@ -71,6 +74,50 @@ def fetch_url(url: str, *, headers: Optional[dict[str, str]] = None, sleep: floa
     raise RuntimeError(f"Failed to fetch {url} after {retries} attempts")
 
 
+def fetch_many(urls: Iterable[str], *, concurrency: int = 16,
+               headers: Optional[dict[str, str]] = None, sleep: float = 0.5,
+               retries: int = 3) -> Iterator[tuple[str, Union[FetchResult, Exception]]]:
+    """Fetches URLs concurrently over one shared connection pool.
+
+    Yields (url, FetchResult or Exception) pairs as fetches complete, so the
+    caller can start processing pages while others are still in flight. The
+    sleep becomes a per-host rate limit instead of a global serial delay:
+    requests to different hosts overlap freely while each host still sees at
+    most one request per sleep interval.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    state_lock = threading.Lock()
+    host_locks: dict[str, threading.Lock] = {}
+    last_request: dict[str, float] = {}
+
+    def _host_lock(host: str) -> threading.Lock:
+        with state_lock:
+            return host_locks.setdefault(host, threading.Lock())
+
+    def _throttled_fetch(url: str) -> FetchResult:
+        host = urlparse(url).netloc
+        with _host_lock(host):
+            elapsed = time.monotonic() - last_request.get(host, 0.0)
+            if elapsed < sleep:
+                time.sleep(sleep - elapsed)
+            last_request[host] = time.monotonic()
+        # sleep=0: politeness is already enforced per host above
+        return fetch_url(url, headers=headers, sleep=0, session=session, retries=retries)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_throttled_fetch, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                yield url, future.result()
+            except Exception as exc:
+                yield url, exc
+
+
 def resolve_url(base_url: str, href: str) -> str:
     """Resolve relative links using the originating URL as the base."""
     return urljoin(base_url, href)
\ No newline at end of file
@@ -11,7 +11,7 @@ from urllib.parse import urlparse
 
 import yaml
 
-from fetch import FetchResult, fetch_url
+from fetch import FetchResult, fetch_many
 from parse_html_cf import extract_main_html
 from parse_pdf import pdf_to_blocks
 from schema import IngestRecord, make_record
@@ -154,15 +154,14 @@ def ingest_from_config(config_path: Path, *, output_dir: Path, bucket: Optional[
     if max_pages is not None:
         seeds = seeds[: int(max_pages)]
 
-    for url in seeds:
-        LOGGER.info("Fetching %s", url)
-        try:
-            result = fetch_url(url)
-        except Exception as exc:
-            LOGGER.error("Failed to fetch %s: %s", url, exc)
+    # Seeds are fetched concurrently over a shared connection pool; pages
+    # are parsed and written as their fetches complete.
+    for url, outcome in fetch_many(seeds):
+        if isinstance(outcome, Exception):
+            LOGGER.error("Failed to fetch %s: %s", url, outcome)
             continue
 
-        records = process_fetch_result(result)
+        records = process_fetch_result(outcome)
         if not records:
             LOGGER.warning("No records produced for %s", url)
             continue
@@ -1,36 +1,89 @@
 """Helpers for writing NDJSON payloads to Google Cloud Storage."""
 from __future__ import annotations
 
+import gzip
+import io
 import json
 import logging
 from pathlib import Path
 from typing import Iterable
 
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 
 LOGGER = logging.getLogger(__name__)
 
 # FinWhiz GCP Configuration
 GCP_PROJECT_ID = "finwhiz-ac215"
 
+# Chunked uploads in 8 MiB pieces instead of the small library default —
+# fewer round trips per file.
+_CHUNK_SIZE = 8 * 1024 * 1024
+
+_CLIENT: storage.Client | None = None
+
+
+def _client() -> storage.Client:
+    """Process-wide storage client, created on first use.
+
+    Building a client per upload re-reads credentials and opens a fresh
+    HTTPS pool, so batch uploads paid a TLS handshake per file.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = storage.Client(project=GCP_PROJECT_ID)
+    return _CLIENT
+
 
 def upload_file_to_gcs(local_path: Path, bucket: str, gcs_path: str) -> None:
     """
     Upload an existing local file to GCS.
-    
+
     This is more efficient than write_ndjson_gcs() when the file already exists locally.
-    
+
     Args:
         local_path: Path to local file
         bucket: GCS bucket name
         gcs_path: Destination path in bucket
     """
-    client = storage.Client(project=GCP_PROJECT_ID)
-    blob = client.bucket(bucket).blob(gcs_path)
+    blob = _client().bucket(bucket).blob(gcs_path)
+    blob.chunk_size = _CHUNK_SIZE
     blob.upload_from_filename(str(local_path), content_type="application/x-ndjson")
     LOGGER.info(f"✓ Uploaded {local_path.name} to gs://{bucket}/{gcs_path}")
 
 
+def upload_files_to_gcs(local_paths: Iterable[Path], bucket: str, gcs_prefix: str,
+                        max_workers: int = 8) -> None:
+    """
+    Upload many local files to GCS in parallel over the shared client.
+
+    Args:
+        local_paths: Paths to local files
+        bucket: GCS bucket name
+        gcs_prefix: Destination prefix in bucket; each file keeps its name
+        max_workers: Number of concurrent uploads
+    """
+    bucket_obj = _client().bucket(bucket)
+    pairs = []
+    for local_path in local_paths:
+        local_path = Path(local_path)
+        blob = bucket_obj.blob(f"{gcs_prefix.rstrip('/')}/{local_path.name}")
+        blob.chunk_size = _CHUNK_SIZE
+        pairs.append((str(local_path), blob))
+
+    results = transfer_manager.upload_many(
+        pairs,
+        max_workers=max_workers,
+        worker_type=transfer_manager.THREAD,
+        raise_exception=False,
+    )
+    for (local_path, blob), result in zip(pairs, results):
+        if isinstance(result, Exception):
+            LOGGER.error(f"Failed to upload {local_path}: {result}")
+        else:
+            LOGGER.info(f"✓ Uploaded {local_path} to gs://{bucket}/{blob.name}")
+
+
 def write_ndjson_gcs(bucket: str, path: str, records: Iterable[dict]) -> None:
     """
     Write NDJSON records directly to GCS (without local file).
@@ -42,13 +95,22 @@ def write_ndjson_gcs(bucket: str, path: str, records: Iterable[dict]) -> None:
         path: Destination path in bucket
         records: Iterable of dict records
     """
-    client = storage.Client(project=GCP_PROJECT_ID)
-    blob = client.bucket(bucket).blob(path)
-    
-    # Convert records to NDJSON format
-    data = "\n".join(json.dumps(record, ensure_ascii=False) for record in records)
-    
-    # Upload with correct content type
-    blob.upload_from_string(data, content_type="application/x-ndjson")
-    
-    LOGGER.info(f"✓ Uploaded {len(data)} bytes to gs://{bucket}/{path}")
\ No newline at end of file
+    blob = _client().bucket(bucket).blob(path)
+
+    # Serialize straight into a gzip buffer: NDJSON's repeated field names
+    # compress 5-10x, and streaming record by record avoids holding the
+    # full uncompressed payload in memory.
+    buf = io.BytesIO()
+    count = 0
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6) as gz:
+        for record in records:
+            gz.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            count += 1
+
+    # content_encoding="gzip" keeps the object readable as plain NDJSON:
+    # GCS transcodes on download.
+    payload = buf.getvalue()
+    blob.content_encoding = "gzip"
+    blob.upload_from_string(payload, content_type="application/x-ndjson")
+
+    LOGGER.info(f"✓ Uploaded {count} records ({len(payload)} bytes gzipped) to gs://{bucket}/{path}")
\ No newline at end of file
@@ -1,7 +1,13 @@
 from __future__ import annotations
 from bs4 import BeautifulSoup
 import re
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional
+from urllib.parse import urljoin
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 
 _WS = re.compile(r"\s+")
 
@@ -11,16 +17,18 @@ def clean_text(s: str) -> str:
     return s.strip()
 
 def extract_links(html: str, base_url: str) -> List[str]:
-    soup = BeautifulSoup(html, "lxml")
+    hrefs: Iterable[Optional[str]]
+    if HTMLParser is not None:
+        hrefs = (a.attributes.get("href") for a in HTMLParser(html).css("a[href]"))
+    else:
+        hrefs = (a.get("href") for a in BeautifulSoup(html, "lxml").select("a[href]"))
     out: List[str] = []
-    for a in soup.select("a[href]"):
-        href = a.get("href")
+    for href in hrefs:
         if not href or href.startswith("#"):
             continue
         if href.startswith(("http://", "https://")):
             out.append(href)
         elif href.startswith("/"):
-            from urllib.parse import urljoin
             out.append(urljoin(base_url, href))
     # dedupe, preserve order
     return list(dict.fromkeys(out))
@@ -4,23 +4,45 @@ from typing import Dict, List
 from bs4 import BeautifulSoup
 from ..common.html_utils import clean_text, extract_links
 
-def within_allow(url: str, allow_patterns: List[str]) -> bool:
-    return any(re.compile(p).search(url) for p in allow_patterns)
+try:
+    # Lexbor-backed parser; several times faster than bs4+lxml and it only
+    # materializes the nodes the selectors touch.
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 
-def matches_deny(url: str, deny_patterns: List[str]) -> bool:
-    return any(re.compile(p).search(url) for p in deny_patterns)
+def within_allow(url: str, allow_patterns: List[re.Pattern]) -> bool:
+    return any(p.search(url) for p in allow_patterns)
+
+def matches_deny(url: str, deny_patterns: List[re.Pattern]) -> bool:
+    return any(p.search(url) for p in deny_patterns)
 
 def extract_page_fields(html: str, url: str, selectors: Dict[str, str]) -> Dict:
-    soup = BeautifulSoup(html, "lxml")
-    title = (soup.select_one(selectors.get("title", "h1")) or soup.select_one("h1"))
-    title_text = clean_text(title.get_text(" ", strip=True)) if title else ""
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        title = tree.css_first(selectors.get("title", "h1")) or tree.css_first("h1")
+        title_text = clean_text(title.text(separator=" ", strip=True)) if title else ""
+
+        pub_el = tree.css_first(selectors.get("publish_date", "time[datetime]"))
+        publish_date = pub_el.attributes.get("datetime") if pub_el else None
+        if not publish_date and pub_el:
+            publish_date = clean_text(pub_el.text(separator=" ", strip=True))
+
+        breadcrumbs = [
+            clean_text(el.text(separator=" ", strip=True))
+            for el in tree.css(selectors.get("breadcrumbs", ".breadcrumb li"))
+        ]
+    else:
+        soup = BeautifulSoup(html, "lxml")
+        title = (soup.select_one(selectors.get("title", "h1")) or soup.select_one("h1"))
+        title_text = clean_text(title.get_text(" ", strip=True)) if title else ""
 
-    pub_el = soup.select_one(selectors.get("publish_date", "time[datetime]"))
-    publish_date = pub_el.get("datetime") if pub_el and pub_el.has_attr("datetime") else None
-    if not publish_date and pub_el:
-        publish_date = clean_text(pub_el.get_text(" ", strip=True))
+        pub_el = soup.select_one(selectors.get("publish_date", "time[datetime]"))
+        publish_date = pub_el.get("datetime") if pub_el and pub_el.has_attr("datetime") else None
+        if not publish_date and pub_el:
+            publish_date = clean_text(pub_el.get_text(" ", strip=True))
 
-    breadcrumbs = [clean_text(el.get_text(" ", strip=True)) for el in soup.select(selectors.get("breadcrumbs", ".breadcrumb li"))]
+        breadcrumbs = [clean_text(el.get_text(" ", strip=True)) for el in soup.select(selectors.get("breadcrumbs", ".breadcrumb li"))]
 
     return {
         "url": url,
@@ -1,32 +1,49 @@
 from __future__ import annotations
+import asyncio
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 from typing import Optional, Tuple
 import time
 
 class Fetcher:
+    """Async HTTP fetcher multiplexing requests over one HTTP/2 connection pool.
+
+    Many requests share one client, so keep-alive connections and TLS
+    handshakes are reused across the whole crawl; each in-flight request
+    costs a task object instead of a thread.
+    """
     def __init__(self, user_agent: str = "finra-rag-bot/0.1", rps: float = 1.0, timeout: float = 20.0):
         self.headers = {"User-Agent": user_agent, "Accept": "text/html,application/xhtml+xml"}
-        self.client = httpx.Client(http2=True, headers=self.headers, timeout=timeout, follow_redirects=True)
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        )
         self._min_interval = 1.0 / max(rps, 0.1)
         self._last_time = 0.0
+        self._throttle_lock = asyncio.Lock()
 
-    def _throttle(self):
-        dt = time.time() - self._last_time
-        if dt < self._min_interval:
-            time.sleep(self._min_interval - dt)
-        self._last_time = time.time()
+    async def _throttle(self):
+        # Paces request *starts* at the configured rps; responses still
+        # arrive concurrently, so network waits overlap.
+        async with self._throttle_lock:
+            dt = time.time() - self._last_time
+            if dt < self._min_interval:
+                await asyncio.sleep(self._min_interval - dt)
+            self._last_time = time.time()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, max=8))
-    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[int, bytes, dict]:
-        self._throttle()
+    async def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[int, bytes, dict]:
+        await self._throttle()
         headers = {}
         if etag:
             headers["If-None-Match"] = etag
         if last_modified:
             headers["If-Modified-Since"] = last_modified
-        r = self.client.get(url, headers=headers)
+        r = await self.client.get(url, headers=headers)
         return r.status_code, r.content, dict(r.headers)
 
-    def close(self):
-        self.client.close()
+    async def close(self):
+        await self.client.aclose()
@@ -1,11 +1,13 @@
 from __future__ import annotations
+import asyncio
 import os
 from pathlib import Path
 import re
 import time
+from urllib.parse import urlparse
 import yaml
 import typer
-from typing import List
+from typing import Dict, List
 from ..common.io_utils import ensure_dir, sha256_of_bytes, write_gzip_bytes, write_json_gz
 from ..common.robots import allowed
 from .frontier import Frontier
@@ -18,6 +20,85 @@ def load_yaml(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+async def crawl(
+    seed_urls: List[str],
+    allow_patterns: List[re.Pattern],
+    deny_patterns: List[re.Pattern],
+    selectors: dict,
+    out: str,
+    parsed_out: str,
+    max_pages: int,
+    rps: float,
+    user_agent: str,
+    concurrency: int = 8,
+) -> int:
+    """Drains the frontier in batches of concurrent fetches.
+
+    Fetches within a batch run as asyncio tasks on one shared HTTP/2
+    client, so network waits overlap; a per-host semaphore caps in-flight
+    requests against any single host. Parsing and disk writes stay
+    sequential per batch.
+    """
+    fetcher = Fetcher(user_agent=user_agent, rps=rps)
+    fr = Frontier(seed_urls)
+    host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(url: str):
+        host = urlparse(url).netloc
+        sem = host_semaphores.setdefault(host, asyncio.Semaphore(4))
+        async with sem:
+            return await fetcher.get(url)
+
+    fetched = 0
+    try:
+        while fetched < max_pages and len(fr) > 0:
+            batch: List[str] = []
+            while len(batch) < concurrency and len(fr) > 0 and fetched + len(batch) < max_pages:
+                url = fr.pop()
+                if not url:
+                    break
+                if not within_allow(url, allow_patterns):
+                    continue
+                if matches_deny(url, deny_patterns):
+                    continue
+                if not allowed(url, user_agent):
+                    continue
+                batch.append(url)
+            if not batch:
+                continue
+
+            results = await asyncio.gather(
+                *(fetch_one(url) for url in batch), return_exceptions=True
+            )
+            for url, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    continue
+                status, content, headers = result
+                if status in (304, 204) or status >= 400:
+                    continue
+
+                sha = sha256_of_bytes(content)
+                day = time.strftime("%Y/%m/%d")
+                raw_path = Path(out) / day / f"{sha}.html.gz"
+                write_gzip_bytes(raw_path, content)
+
+                page = extract_page_fields(content.decode("utf-8", errors="ignore"), url, selectors)
+                write_json_gz(Path(parsed_out) / f"{sha}.json.gz", page)
+
+                for link in page["links"]:
+                    if matches_deny(link, deny_patterns):
+                        continue
+                    if not within_allow(link, allow_patterns):
+                        continue
+                    if allowed(link, user_agent):
+                        fr.push(link)
+
+                fetched += 1
+    finally:
+        await fetcher.close()
+
+    return fetched
+
 @app.command()
 def main(
     seeds: str = typer.Option(..., help="Path to crawl_allowlist.yml"),
@@ -28,58 +109,33 @@ def main(
     max_pages: int = typer.Option(200, help="Max pages to fetch"),
     rps: float = typer.Option(float(os.getenv("RPS", "1.0")), help="Requests per second"),
     user_agent: str = typer.Option(os.getenv("HTTP_USER_AGENT", "finra-rag-bot/0.1")),
+    concurrency: int = typer.Option(8, help="Max concurrent fetches"),
 ):
     seeds_cfg = load_yaml(seeds)
-    allow_patterns: List[str] = seeds_cfg.get("allow", [])
+    # Compile once here; the crawl loop checks every URL and link against
+    # these, and re.compile per check would dominate the filter cost.
+    allow_patterns: List[re.Pattern] = [re.compile(p) for p in seeds_cfg.get("allow", [])]
     seed_urls: List[str] = seeds_cfg.get("seeds", [])
 
-    deny_patterns: List[str] = load_yaml(blocklist).get("deny", [])
+    deny_patterns: List[re.Pattern] = [re.compile(p) for p in load_yaml(blocklist).get("deny", [])]
     selectors = load_yaml(selectors_path)
 
     ensure_dir(out)
     ensure_dir(parsed_out)
 
-    fetcher = Fetcher(user_agent=user_agent, rps=rps)
-    fr = Frontier(seed_urls)
-
-    fetched = 0
     start = time.time()
-
-    try:
-        while fetched < max_pages and len(fr) > 0:
-            url = fr.pop()
-            if not url:
-                break
-            if not within_allow(url, allow_patterns):
-                continue
-            if matches_deny(url, deny_patterns):
-                continue
-            if not allowed(url, user_agent):
-                continue
-
-            status, content, headers = fetcher.get(url)
-            if status in (304, 204) or status >= 400:
-                continue
-
-            sha = sha256_of_bytes(content)
-            day = time.strftime("%Y/%m/%d")
-            raw_path = Path(out) / day / f"{sha}.html.gz"
-            write_gzip_bytes(raw_path, content)
-
-            page = extract_page_fields(content.decode("utf-8", errors="ignore"), url, selectors)
-            write_json_gz(Path(parsed_out) / f"{sha}.json.gz", page)
-
-            for link in page["links"]:
-                if matches_deny(link, deny_patterns):
-                    continue
-                if not within_allow(link, allow_patterns):
-                    continue
-                if allowed(link, user_agent):
-                    fr.push(link)
-
-            fetched += 1
-    finally:
-        fetcher.close()
+    fetched = asyncio.run(crawl(
+        seed_urls,
+        allow_patterns,
+        deny_patterns,
+        selectors,
+        out,
+        parsed_out,
+        max_pages,
+        rps,
+        user_agent,
+        concurrency=concurrency,
+    ))
 
     dur = time.time() - start
     print(f"Fetched {fetched} pages in {dur:.1f}s → {out}")
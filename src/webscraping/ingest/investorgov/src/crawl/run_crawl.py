@@ -1,55 +1,68 @@
 import argparse
 import yaml
+from collections import deque
 from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 import re
 
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Referer": "https://www.google.com/"
+    }
+
 def load_allowlist(path):
     with open(path) as f:
         return yaml.safe_load(f)
 
 def should_follow(url, allow_regexes, deny_regexes):
     for dr in deny_regexes:
-        if re.match(dr, url):
+        if dr.match(url):
             return False
     for ar in allow_regexes:
-        if re.match(ar, url):
+        if ar.match(url):
             return True
     return False
 
-def crawl_seed(seed_url, allow, deny, visited, out_dir):
-    try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Referer": "https://www.google.com/"
-            }
-        r = requests.get(seed_url, timeout=10, headers=headers)
-        r.raise_for_status()
-    except Exception as e:
-        print(f"Failed to fetch {seed_url}: {e}")
-        return
+def crawl(seeds, allow, deny, out_dir):
+    # Iterative BFS with a deque: no RecursionError on deep link graphs,
+    # and one Session keeps connections to investor.gov alive across pages.
+    session = requests.Session()
+    queue = deque(seeds)
+    visited = set()
+
+    while queue:
+        url = queue.popleft()
+        if url in visited:
+            continue
+        visited.add(url)
 
-    html = r.text
-    filename = seed_url.replace("/", "_").replace(":", "")
-    (out_dir / (filename + ".html")).write_text(html, encoding="utf-8")
-    visited.add(seed_url)
+        try:
+            r = session.get(url, timeout=10, headers=HEADERS)
+            r.raise_for_status()
+        except Exception as e:
+            print(f"Failed to fetch {url}: {e}")
+            continue
 
-    soup = BeautifulSoup(html, "html.parser")
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        # Normalize absolute/relative
-        if href.startswith("/"):
-            href = "https://www.investor.gov" + href
-        if href.startswith("http"):
-            if href not in visited and should_follow(href, allow, deny):
-                crawl_seed(href, allow, deny, visited, out_dir)
+        html = r.text
+        filename = url.replace("/", "_").replace(":", "")
+        (out_dir / (filename + ".html")).write_text(html, encoding="utf-8")
+
+        soup = BeautifulSoup(html, "html.parser")
+        for link in soup.find_all("a", href=True):
+            href = link["href"]
+            # Normalize absolute/relative
+            if href.startswith("/"):
+                href = "https://www.investor.gov" + href
+            if href.startswith("http"):
+                if href not in visited and should_follow(href, allow, deny):
+                    queue.append(href)
 
 
 def main():
@@ -60,15 +73,14 @@ def main():
 
     config = load_allowlist(args.seeds)
     seeds = config.get("seeds", [])
-    allow = config.get("allow", [])
-    deny = config.get("deny", [])
+    # Compile once; should_follow runs per extracted link
+    allow = [re.compile(p) for p in config.get("allow", [])]
+    deny = [re.compile(p) for p in config.get("deny", [])]
 
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    visited = set()
-    for s in seeds:
-        crawl_seed(s, allow, deny, visited, out_dir)
+    crawl(seeds, allow, deny, out_dir)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()